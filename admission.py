@@ -0,0 +1,168 @@
+import asyncio
+import math
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# 요청 전체의 마감 시각(time.monotonic 기준). 모델/도구 호출은 남은 시간 안에서만 기다립니다.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class OverloadedError(Exception):
+    """대기열이 가득 찼거나 대기 시간을 넘겨 요청을 거절할 때 씁니다. HTTP 응답의 상태 코드와 Retry-After 를 담습니다."""
+
+    def __init__(self, message: str, retry_after: float = 1.0, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class DeadlineExceededError(Exception):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """지금부터 seconds 초 뒤를 마감으로 정합니다. 이미 더 이른 마감이 있으면 그것을 유지합니다."""
+    if seconds is None:
+        yield
+        return
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # 스트리밍 제너레이터가 다른 태스크에서 정리될 때는 컨텍스트가 달라 reset 할 수 없습니다.
+            pass
+
+
+def remaining() -> Optional[float]:
+    """마감까지 남은 초. 마감이 없으면 None."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+async def with_deadline(awaitable: Awaitable[Any], what: str) -> Any:
+    """마감 안에 끝나지 않으면 취소하고 DeadlineExceededError 를 던집니다."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceededError(f"{what}: 요청 마감 시간을 넘었습니다.")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError(f"{what}: 요청 마감 시간을 넘었습니다.")
+
+
+def is_transient(error: BaseException) -> bool:
+    """재시도할 만한 일시적 오류인지 판단합니다. genai.errors.APIError 는 code 속성으로 상태 코드를 줍니다."""
+    if isinstance(error, (OverloadedError, DeadlineExceededError)):
+        return False
+    if getattr(error, "code", None) in (429, 500, 502, 503, 504):
+        return True
+    return isinstance(error, (ConnectionError, asyncio.TimeoutError))
+
+
+async def retry_with_backoff(
+    call: Callable[[], Awaitable[Any]],
+    attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    on_retry: Optional[Callable[[BaseException], None]] = None,
+) -> Any:
+    """
+    일시적 오류면 full jitter 지수 백오프로 다시 시도합니다.
+    다음 시도까지 기다리면 마감을 넘기는 경우에는 바로 마지막 오류를 던집니다.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            left = remaining()
+            if left is not None and delay >= left:
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            await asyncio.sleep(delay)
+
+
+class BackendLimiter:
+    """
+    백엔드(Gemini, Naver MCP, 내부 MCP)별 동시 실행 수 제한과 크기가 정해진 대기열입니다.
+
+    동시 실행이 max_concurrency 에 찼을 때 대기 중인 요청이 max_queue 이상이면 기다리지 않고 바로 거절하고,
+    대기하더라도 queue_timeout 과 요청 마감 중 이른 시각까지만 기다립니다.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float = 5.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self._avg_hold = 1.0  # 슬롯 점유 시간 지수 이동 평균(초), Retry-After 추정에 씁니다.
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_hold * (self.waiting + 1) / self.max_concurrency))
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(f"{self.name} 대기열이 가득 찼습니다.", retry_after=self.retry_after())
+
+        timeout = self.queue_timeout
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, max(left, 0.0))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            self.rejected += 1
+            raise OverloadedError(f"{self.name} 대기 시간을 넘었습니다.", retry_after=self.retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.admitted += 1
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+            "avg_hold_seconds": round(self._avg_hold, 3),
+        }
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# 입력 중인 마지막 글자의 받침은 다음 글자의 초성일 수 있습니다 ("텟" -> "테스..."). 받침 -> 초성(들) 변환표입니다.
+_FINAL_TO_INITIAL = {
+    "ᆨ": "ᄀ", "ᆩ": "ᄁ", "ᆫ": "ᄂ", "ᆮ": "ᄃ", "ᆯ": "ᄅ",
+    "ᆷ": "ᄆ", "ᆸ": "ᄇ", "ᆺ": "ᄉ", "ᆻ": "ᄊ", "ᆼ": "ᄋ",
+    "ᆽ": "ᄌ", "ᆾ": "ᄎ", "ᆿ": "ᄏ", "ᇀ": "ᄐ", "ᇁ": "ᄑ",
+    "ᇂ": "ᄒ",
+    # 겹받침은 앞 자음을 받침으로 남기고 뒤 자음을 초성으로 ("닭" -> "달ㄱ")
+    "ᆪ": "ᆨᄉ", "ᆬ": "ᆫᄌ", "ᆭ": "ᆫᄒ", "ᆰ": "ᆯᄀ",
+    "ᆱ": "ᆯᄆ", "ᆲ": "ᆯᄇ", "ᆳ": "ᆯᄉ", "ᆴ": "ᆯᄐ",
+    "ᆵ": "ᆯᄑ", "ᆶ": "ᆯᄒ", "ᆹ": "ᆸᄉ",
+}
+
+
+def normalize_key(text: str) -> str:
+    """
+    별칭 비교용 키. 전각/반각과 대소문자, 공백/구두점 차이를 없애고,
+    한글은 자모(NFD)로 풀어 "테ㅅ" 처럼 입력 중인 글자도 접두사로 비교되게 합니다.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return unicodedata.normalize("NFD", _NON_WORD.sub("", text))
+
+
+def normalize_keyword(text: str) -> str:
+    """사전에 없는 키워드의 표기. 공백을 정리하고 대문자로 씁니다. API 응답에는 이 표기를 그대로 돌려줍니다."""
+    return " ".join((text or "").split()).upper()
+
+
+class Entity(BaseModel):
+    id: str  # 정규 ID. 미국 종목은 티커, 국내 종목은 종목코드
+    name: str  # 대표 한글 이름
+    name_en: str = ""
+    market: str = ""
+    aliases: List[str] = []
+    rank: int = 0  # 작을수록 인기 종목. 자동완성 정렬과 별칭 충돌 시 우선순위에 씁니다.
+
+    @property
+    def label(self) -> str:
+        """프롬프트에 넣는 표기. 이름과 ID 가 다르면 함께 씁니다. 예: "테슬라 (TSLA)" """
+        return self.name if self.name == self.id else f"{self.name} ({self.id})"
+
+
+class _Node:
+    __slots__ = ("children", "entity_id", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entity_id: Optional[str] = None
+        self.top: List[str] = []  # 이 접두사로 시작하는 별칭의 종목 ID, rank 순 상위 max_suggestions 개
+
+
+class AliasIndex:
+    """
+    종목 사전(한글명, 영문명, 티커/종목코드, 흔한 오타)을 정규화된 키의 사전과 자모 단위 trie 로 색인합니다.
+
+    resolve() 는 사전 조회 한 번으로 키워드를 종목으로 바꾸고, suggest() 는 trie 노드마다 미리 계산해 둔
+    상위 후보를 돌려주므로 둘 다 사전 크기와 무관하게 마이크로초 단위로 끝납니다.
+
+    JSONL 한 줄 형식: {"id": "TSLA", "name": "테슬라", "name_en": "Tesla", "market": "NASDAQ", "aliases": ["테슬러"]}
+    rank 가 없으면 파일 순서를 인기 순위로 씁니다.
+    """
+
+    def __init__(self, entities: List[Entity], max_suggestions: int = 10):
+        self.max_suggestions = max_suggestions
+        self._entities: Dict[str, Entity] = {}
+        self._exact: Dict[str, str] = {}
+        self._root = _Node()
+        self._nodes = 1
+        for entity in sorted(entities, key=lambda e: e.rank):
+            self._add(entity)
+        self._fill_top(self._root)
+
+    @classmethod
+    def from_jsonl(cls, path: str, max_suggestions: int = 10) -> "AliasIndex":
+        entities = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for rank, line in enumerate(f):
+                    if not line.strip():
+                        continue
+                    try:
+                        entities.append(Entity(**{"rank": rank, **json.loads(line)}))
+                    except ValueError as e:
+                        logger.warning("잘못된 종목 사전 줄을 건너뜁니다 %s:%d: %s", path, rank + 1, e)
+        else:
+            logger.warning("종목 사전 파일이 없습니다: %s", path)
+        return cls(entities, max_suggestions)
+
+    def resolve(self, text: str) -> Optional[Entity]:
+        """
+        키워드 전체가 별칭과 정확히 일치할 때만 종목으로 바꾸고, 아니면 None.
+        접두사로 맞추면 "카카오뱅크" -> 카카오, "삼성전자우" -> 삼성전자 처럼 다른 종목이나
+        "테슬라 실적 발표 언제야" 같은 질의가 한 종목으로 합쳐지므로, 접두사 비교는 suggest() 에서만 합니다.
+        """
+        entity_id = self._exact.get(normalize_key(text))
+        return self._entities.get(entity_id) if entity_id is not None else None
+
+    def keyword_id(self, text: str) -> str:
+        """캐시 키와 콘텐츠 조회에 쓰는 정규 키워드. 사전에 없는 키워드는 normalize_keyword() 표기를 씁니다."""
+        entity = self.resolve(text)
+        if entity is not None:
+            return entity.id
+        return normalize_keyword(text)
+
+    def label(self, text: str) -> str:
+        """프롬프트에 넣을 키워드 표기."""
+        entity = self.resolve(text)
+        return entity.label if entity is not None else self.keyword_id(text)
+
+    def get(self, entity_id: str) -> Optional[Entity]:
+        return self._entities.get(entity_id)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Entity]:
+        """prefix 로 시작하는 별칭을 가진 종목을 인기순으로 limit 개까지 반환합니다. limit 은 1 ~ max_suggestions 로 맞춥니다."""
+        limit = max(1, min(limit, self.max_suggestions))
+        key = normalize_key(prefix)
+        if not key:
+            return []
+        keys = [key]
+        if key[-1] in _FINAL_TO_INITIAL:
+            keys.append(key[:-1] + _FINAL_TO_INITIAL[key[-1]])
+        found: List[str] = []
+        for candidate in keys:
+            node = self._walk(candidate)
+            if node is not None:
+                found.extend(entity_id for entity_id in node.top if entity_id not in found)
+        if len(keys) > 1:
+            found.sort(key=lambda entity_id: self._entities[entity_id].rank)
+        return [self._entities[entity_id] for entity_id in found[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entities": len(self._entities), "aliases": len(self._exact), "trie_nodes": self._nodes}
+
+    def _add(self, entity: Entity):
+        if entity.id in self._entities:
+            logger.warning("중복된 종목 ID 를 건너뜁니다: %s", entity.id)
+            return
+        self._entities[entity.id] = entity
+        for alias in [entity.id, entity.name, entity.name_en, *entity.aliases]:
+            key = normalize_key(alias)
+            if not key:
+                continue
+            owner = self._exact.setdefault(key, entity.id)
+            if owner != entity.id:
+                # rank 순으로 넣으므로 먼저 들어온 인기 종목이 별칭을 가집니다.
+                logger.debug("별칭 %r 은 이미 %s 의 별칭입니다 (%s 건너뜀)", alias, owner, entity.id)
+                continue
+            node = self._root
+            for char in key:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                    self._nodes += 1
+                node = child
+            node.entity_id = entity.id
+
+    def _fill_top(self, node: _Node) -> List[str]:
+        candidates = [node.entity_id] if node.entity_id is not None else []
+        for child in node.children.values():
+            candidates.extend(self._fill_top(child))
+        unique = sorted(set(candidates), key=lambda entity_id: self._entities[entity_id].rank)
+        node.top = unique[:self.max_suggestions]
+        return node.top
+
+    def _walk(self, key: str) -> Optional[_Node]:
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+
+def default_index() -> AliasIndex:
+    """ENTITY_DICT_PATH(기본값 data/entities.jsonl) 의 종목 사전으로 만든 인덱스. API 서버와 mcp_main.py 가 함께 씁니다."""
+    return AliasIndex.from_jsonl(
+        os.getenv("ENTITY_DICT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "entities.jsonl"))
+    )
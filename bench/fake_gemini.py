@@ -0,0 +1,144 @@
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from google.genai import errors, types
+from mcp import ClientSession
+
+
+class FakeGeminiClient:
+    """
+    genai.Client 대신 쓰는 오프라인 모델입니다. main.gemini_client 를 이 객체로 바꿔 끼워 씁니다.
+
+    config.tools 에 MCP 세션이 있으면 실제 Gemini 의 자동 함수 호출처럼 세션마다 list_tools 후
+    도구를 tool_calls_per_session 개까지 호출하고, latency(±jitter) 초 뒤 질문 JSON 을 반환합니다.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.2,
+        tool_calls_per_session: int = 1,
+        stream_chunks: int = 8,
+        failure_rate: float = 0.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.tool_calls_per_session = tool_calls_per_session
+        self.stream_chunks = stream_chunks
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.tool_calls = 0
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self._generate_content,
+            generate_content_stream=self._generate_content_stream,
+        ))
+
+    async def _generate_content(self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None, **kwargs):
+        text = await self._run(contents, config)
+        return self._response(text, contents)
+
+    async def _generate_content_stream(self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None, **kwargs):
+        self.calls += 1
+        await self._call_tools(contents, config)
+        text = self._answer(contents)
+        size = max(1, len(text) // self.stream_chunks + 1)
+        delay = self._delay() / self.stream_chunks
+
+        # 실제 generate_content_stream 처럼 요청은 첫 청크를 꺼낼 때 보내므로 오류도 그때 납니다.
+        async def chunks():
+            self._maybe_fail()
+            for start in range(0, len(text), size):
+                await asyncio.sleep(delay)
+                end = start + size
+                yield self._response(text[start:end], contents, with_usage=end >= len(text))
+
+        return chunks()
+
+    async def _run(self, contents: Any, config: Optional[types.GenerateContentConfig]) -> str:
+        self.calls += 1
+        await self._call_tools(contents, config)
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+        return self._answer(contents)
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            # 실제 Gemini 처럼 code 가 있는 ClientError 로 던져 재시도/거절 경로를 탈 수 있게 합니다.
+            raise errors.ClientError(429, {"error": {"code": 429, "message": "fake gemini quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+
+    async def _call_tools(self, contents: Any, config: Optional[types.GenerateContentConfig]):
+        keyword = _keyword(contents)
+        for tool in (config.tools if config is not None and config.tools else []):
+            if not isinstance(tool, ClientSession):
+                continue
+            listed = await tool.list_tools()
+            for mcp_tool in listed.tools[:self.tool_calls_per_session]:
+                self.tool_calls += 1
+                try:
+                    await tool.call_tool(name=mcp_tool.name, arguments=_arguments(mcp_tool.inputSchema, keyword))
+                except Exception:
+                    # 실제 genai 처럼 도구 예외는 모델에게 오류 응답으로 넘기고 생성을 계속합니다.
+                    pass
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def _answer(self, contents: Any) -> str:
+        keyword = _keyword(contents)
+        # 1단계 시장 정보 요약 프롬프트는 출력 형식 안내에 MarketSummary 스키마(key_facts 등)가 들어 있습니다.
+        if "key_facts" in str(contents):
+            return json.dumps({
+                "summary": f"{keyword} 주가는 최근 실적 기대감과 금리 인하 전망 속에 강세를 보이고 있어요.",
+                "key_facts": [f"{keyword} 9월 5일 이후 연속 상승", "다음 주 실적 발표 예정"],
+                "news": [{"title": f"{keyword} 관련 뉴스 1", "date": "2025-09-11", "summary": "시장 기대감 속에 주가 상승"}],
+                "macro": ["FOMC 금리 결정", "원/달러 환율"],
+                "terms": ["PER", "어닝 서프라이즈"],
+                "related": ["반도체", "AI"],
+                "internal_commentary": "",
+            }, ensure_ascii=False)
+        questions = [
+            f"{keyword} 주가, 최근 실적 발표 이후 어떻게 될까?",
+            f"FOMC 금리 결정이 {keyword}에 미칠 영향은?",
+            f"{keyword} 관련 산업 동향, 핵심만 알려줘",
+            "PER이 높다는 게 정확히 무슨 뜻이야?",
+            f"{keyword} 급등 이유가 뭐야?",
+        ]
+        return json.dumps({"keyword": keyword, "questions": questions}, ensure_ascii=False)
+
+    def _response(self, text: str, contents: Any, with_usage: bool = True) -> types.GenerateContentResponse:
+        usage = None
+        if with_usage:
+            prompt_tokens = len(str(contents)) // 2
+            usage = types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=len(text) // 2,
+                total_token_count=prompt_tokens + len(text) // 2,
+            )
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))],
+            usage_metadata=usage,
+        )
+
+
+def _keyword(contents: Any) -> str:
+    match = re.search(r"### Keyword\s*```\s*(.+?)\s*```", str(contents))
+    return match.group(1) if match else "KEYWORD"
+
+
+def _arguments(schema: Dict[str, Any], keyword: str) -> Dict[str, Any]:
+    """도구 입력 스키마의 필수 인자를 채웁니다. 이름에 date 가 들어가면 날짜, 나머지 문자열은 키워드를 넣습니다."""
+    arguments: Dict[str, Any] = {}
+    properties = schema.get("properties", {})
+    for name in schema.get("required", list(properties)):
+        kind = properties.get(name, {}).get("type")
+        if "date" in name:
+            arguments[name] = "2025-09-11"
+        elif kind in ("integer", "number"):
+            arguments[name] = 10
+        else:
+            arguments[name] = keyword
+    return arguments
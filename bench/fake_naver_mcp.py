@@ -0,0 +1,27 @@
+from fastmcp import FastMCP
+import asyncio
+import json
+import os
+
+# Smithery 의 naver-search MCP 대신 쓰는 로컬 서버입니다. mcp_main.py 와 같은 방식으로 stdio 로 실행됩니다.
+mcp = FastMCP(name="naver-search")
+
+latency = float(os.getenv("FAKE_NAVER_LATENCY", "0.3"))
+
+@mcp.tool()
+async def search_news(query: str, display: int = 10) -> str:
+    """네이버 뉴스 검색 결과를 흉내 냅니다. FAKE_NAVER_LATENCY 초만큼 기다린 뒤 고정된 기사 목록을 반환합니다."""
+    await asyncio.sleep(latency)
+    items = [
+        {
+            "title": f"{query} 관련 뉴스 {i + 1}",
+            "description": f"{query} 주가가 시장 기대감 속에 움직였다. 금리, 환율, 실적 발표 일정이 변수로 꼽힌다.",
+            "pubDate": "Thu, 11 Sep 2025 09:00:00 +0900",
+        }
+        for i in range(display)
+    ]
+    return json.dumps({"query": query, "items": items}, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    mcp.run()
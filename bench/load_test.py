@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+오프라인 부하 테스트
+
+main.app 을 같은 프로세스에서 uvicorn 으로 띄우고, Gemini 는 FakeGeminiClient 로,
+Naver 검색 MCP 는 bench/fake_naver_mcp.py 로 바꿔 실제 API 쿼터 없이 /questions 를 부하 테스트합니다.
+
+    python bench/load_test.py --requests 200 --concurrency 20
+    python bench/load_test.py --endpoint /questions/stream --unique-profiles --json
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="오프라인 /questions 부하 테스트")
+    parser.add_argument("--requests", type=int, default=100, help="보낼 요청 수")
+    parser.add_argument("--concurrency", type=int, default=10, help="동시 요청 수")
+    parser.add_argument("--endpoint", default="/questions", choices=["/questions", "/questions/stream"])
+    parser.add_argument("--keywords", default="테슬라,오라클,엔비디아,애플", help="쉼표로 구분한 키워드, 요청마다 돌아가며 사용")
+    parser.add_argument("--unique-profiles", action="store_true", help="요청마다 다른 프로필을 보내 응답 캐시를 우회")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="가짜 Gemini 응답 지연(초)")
+    parser.add_argument("--gemini-jitter", type=float, default=0.2)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--naver-latency", type=float, default=0.3, help="가짜 Naver MCP 도구 지연(초)")
+    parser.add_argument("--pool-size", type=int, default=4, help="MCP_POOL_SIZE")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace):
+    """main 을 import 하기 전에 오프라인 실행용 환경 변수를 설정합니다. 이미 설정된 값은 그대로 둡니다."""
+    os.environ.setdefault("NAVER_MCP_URL", os.path.join(BENCH_DIR, "fake_naver_mcp.py"))
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("PREGEN_ENABLED", "false")
+    os.environ["MCP_POOL_SIZE"] = str(args.pool_size)
+    os.environ["FAKE_NAVER_LATENCY"] = str(args.naver_latency)
+    sys.path.insert(0, ROOT_DIR)
+    os.chdir(ROOT_DIR)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb() -> float:
+    # Linux 는 KB, macOS 는 byte 단위입니다.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def child_processes() -> Optional[int]:
+    """이 프로세스가 띄운 자식 프로세스(stdio MCP 서버) 수. /proc 가 없으면 None."""
+    paths = glob.glob(f"/proc/{os.getpid()}/task/*/children")
+    if not paths:
+        return None
+    children = set()
+    for path in paths:
+        with open(path) as f:
+            children.update(f.read().split())
+    return len(children)
+
+
+def open_sockets() -> Optional[int]:
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+def build_payload(args: argparse.Namespace, index: int, keywords: List[str]) -> Dict[str, Any]:
+    holdings = [{"종목명": "삼성전자"}]
+    if args.unique_profiles:
+        holdings.append({"종목명": f"종목{index}"})
+    return {
+        "keyword": keywords[index % len(keywords)],
+        "user_data": {
+            "user_id": f"bench_{index}",
+            "characteristics": [
+                {"characteristic": "투자경험수준", "value": ["초보자", "중급자", "고급자"][index % 3]},
+                {"characteristic": "자산포트폴리오정보", "value": {"보유종목": holdings}},
+                {"characteristic": "관심섹터", "value": "반도체"},
+            ],
+        },
+    }
+
+
+async def send(client, args: argparse.Namespace, payload: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    first_question = None
+    try:
+        if args.endpoint == "/questions/stream":
+            status = None
+            async with client.stream("POST", args.endpoint, json=payload) as response:
+                status = response.status_code
+                async for line in response.aiter_lines():
+                    if line == "event: question" and first_question is None:
+                        first_question = time.perf_counter() - started
+                    elif line == "event: error":
+                        status = 500
+        else:
+            response = await client.post(args.endpoint, json=payload)
+            status = response.status_code
+    except Exception as e:
+        return {"ok": False, "status": type(e).__name__, "latency": time.perf_counter() - started, "first_question": None}
+    return {"ok": status == 200, "status": status, "latency": time.perf_counter() - started, "first_question": first_question}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    import uvicorn
+    import main as app_module
+    from bench.fake_gemini import FakeGeminiClient
+
+    fake_gemini = FakeGeminiClient(
+        latency=args.gemini_latency, jitter=args.gemini_jitter, failure_rate=args.gemini_failure_rate
+    )
+    app_module.gemini_client = fake_gemini
+
+    baseline = {"rss_mb": rss_mb(), "child_processes": child_processes(), "open_sockets": open_sockets()}
+
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    startup_started = time.perf_counter()
+    while not server.started:
+        if server_task.done():
+            server_task.result()
+        await asyncio.sleep(0.05)
+    startup_seconds = time.perf_counter() - startup_started
+    after_startup = {"rss_mb": rss_mb(), "child_processes": child_processes(), "open_sockets": open_sockets()}
+
+    keywords = [keyword.strip() for keyword in args.keywords.split(",") if keyword.strip()]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    peak = {"child_processes": after_startup["child_processes"], "open_sockets": after_startup["open_sockets"]}
+
+    async def one(client, index: int):
+        async with semaphore:
+            result = await send(client, args, build_payload(args, index, keywords))
+        for key, value in (("child_processes", child_processes()), ("open_sockets", open_sockets())):
+            if value is not None and (peak[key] is None or value > peak[key]):
+                peak[key] = value
+        return result
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits) as client:
+        load_started = time.perf_counter()
+        results = await asyncio.gather(*(one(client, i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - load_started
+        pool_stats = (await client.get("/pool/stats")).json()
+        cache_stats = (await client.get("/cache/stats")).json()
+
+    server.should_exit = True
+    await server_task
+
+    latencies = [result["latency"] for result in results if result["ok"]]
+    first_questions = [result["first_question"] for result in results if result["first_question"] is not None]
+    statuses: Dict[str, int] = {}
+    for result in results:
+        statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+
+    ms = lambda value: round(value * 1000, 1) if value is not None else None
+    return {
+        "endpoint": args.endpoint,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "succeeded": len(latencies),
+        "failed": args.requests - len(latencies),
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(args.requests / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {"p50": ms(percentile(latencies, 0.5)), "p99": ms(percentile(latencies, 0.99)), "max": ms(max(latencies) if latencies else None)},
+        "first_question_ms": {"p50": ms(percentile(first_questions, 0.5)), "p99": ms(percentile(first_questions, 0.99))} if first_questions else None,
+        "startup_seconds": round(startup_seconds, 3),
+        "memory_mb": {"baseline": baseline["rss_mb"], "after_startup": after_startup["rss_mb"], "end": rss_mb(), "peak": peak_rss_mb()},
+        "child_processes": {"after_startup": after_startup["child_processes"], "peak": peak["child_processes"]},
+        "open_sockets": {"after_startup": after_startup["open_sockets"], "peak": peak["open_sockets"]},
+        "gemini_calls": fake_gemini.calls,
+        "gemini_tool_calls": fake_gemini.tool_calls,
+        "mcp_pools": pool_stats,
+        "caches": cache_stats,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"endpoint            {report['endpoint']}  (requests={report['requests']}, concurrency={report['concurrency']})")
+    print(f"succeeded / failed  {report['succeeded']} / {report['failed']}  {report['statuses']}")
+    print(f"throughput          {report['requests_per_second']} req/s over {report['elapsed_seconds']}s")
+    print(f"latency             p50={report['latency_ms']['p50']}ms  p99={report['latency_ms']['p99']}ms  max={report['latency_ms']['max']}ms")
+    if report["first_question_ms"]:
+        print(f"first question      p50={report['first_question_ms']['p50']}ms  p99={report['first_question_ms']['p99']}ms")
+    print(f"startup             {report['startup_seconds']}s")
+    memory = report["memory_mb"]
+    print(f"memory (RSS MB)     baseline={memory['baseline']}  after_startup={memory['after_startup']}  end={memory['end']}  peak={memory['peak']}")
+    print(f"child processes     after_startup={report['child_processes']['after_startup']}  peak={report['child_processes']['peak']}")
+    print(f"open sockets        after_startup={report['open_sockets']['after_startup']}  peak={report['open_sockets']['peak']}")
+    print(f"gemini calls        {report['gemini_calls']} (tool calls {report['gemini_tool_calls']})")
+    for name, stats in report["mcp_pools"].items():
+        print(f"mcp pool {name:<10} connected={stats['connected']}/{stats['size']}  acquires={stats['acquires']}  avg_wait={stats['avg_wait_ms']}ms  reconnects={stats['reconnects']}")
+    responses = report["caches"]["responses"]
+    print(f"response cache      hits={responses['hits']}  misses={responses['misses']}  coalesced={responses['coalesced']}  hit_rate={responses['hit_rate']}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_environment(args)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+워커 기동 시간 측정
+
+새 프로세스에서 main 을 import 하는 데 걸리는 시간/메모리와, lifespan 이 끝나 요청을 받을 수 있을 때까지의
+시간을 잽니다. 매번 새 인터프리터로 실행하므로 콜드 스타트 기준이며, Naver MCP 는 bench/fake_naver_mcp.py 를 씁니다.
+
+    python bench/startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+# 자식 프로세스에서 실행하는 측정 코드입니다.
+PROBE = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+
+before = rss_mb()
+import main
+imported = time.perf_counter()
+after_import = rss_mb()
+heavy = [name for name in ("google.genai", "fastmcp", "langchain") if name in sys.modules]
+
+async def ready():
+    async with main.lifespan(main.app):
+        return time.perf_counter(), rss_mb()
+
+ready_at, after_ready = asyncio.run(ready())
+print(json.dumps({
+    "import_seconds": imported - started,
+    "ready_seconds": ready_at - started,
+    "rss_before_mb": before,
+    "rss_after_import_mb": after_import,
+    "rss_after_ready_mb": after_ready,
+    "heavy_modules_at_import": heavy,
+}))
+"""
+
+
+def run_once() -> dict:
+    env = dict(os.environ)
+    env.setdefault("NAVER_MCP_URL", os.path.join(BENCH_DIR, "fake_naver_mcp.py"))
+    env.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    env.setdefault("PREGEN_ENABLED", "false")
+    env.setdefault("FAKE_NAVER_LATENCY", "0")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="워커 기동 시간/메모리 측정")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    report = {
+        key: round(statistics.median(run[key] for run in runs), 3)
+        for key in ("import_seconds", "ready_seconds", "rss_before_mb", "rss_after_import_mb", "rss_after_ready_mb")
+    }
+    report["import_memory_mb"] = round(report["rss_after_import_mb"] - report["rss_before_mb"], 1)
+    report["heavy_modules_at_import"] = runs[-1]["heavy_modules_at_import"]
+    report["runs"] = args.runs
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"import main        {report['import_seconds']}s  (+{report['import_memory_mb']} MB RSS)")
+    print(f"ready (lifespan)   {report['ready_seconds']}s  ({report['rss_after_ready_mb']} MB RSS)")
+    print(f"heavy at import    {', '.join(report['heavy_modules_at_import']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # parquet 파일은 pyarrow 가 있을 때만 읽습니다.
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+
+class ContentStore:
+    """
+    (date, ticker) 로 애널리스트 코멘터리를 찾는 파일 기반 저장소입니다.
+
+    content_dir 아래의 *.jsonl / *.parquet 파일을 읽어 (date, ticker) -> 본문 위치 인덱스만 메모리에 두고,
+    JSONL 본문은 열어 둔 파일에서 필요할 때 해당 줄만 pread 로 읽습니다.
+    파일이 추가/변경/삭제되면 reload_interval 마다 해당 파일만 다시 인덱싱합니다.
+
+    파일은 임시 파일에 쓴 뒤 rename 으로 바꿔 넣는 것을 권장합니다. 제자리에서 고쳐 쓰면 다음 reload 전까지
+    옛 위치를 읽게 되는데, 이때 읽은 줄의 (date, ticker) 가 인덱스와 다르면 없는 것으로 처리합니다.
+
+    JSONL 한 줄 형식: {"date": "2025-09-11", "ticker": "테슬라", "body": "..."}
+    ticker_key 를 주면 파일의 ticker 와 조회 인자를 모두 ticker_key 로 바꿔 비교합니다(예: 별칭 -> 정규 종목 ID).
+    """
+
+    def __init__(self, content_dir: str, reload_interval: float = 5.0, ticker_key: Optional[Callable[[str], str]] = None):
+        self.content_dir = content_dir
+        self.reload_interval = reload_interval
+        self._ticker_key = ticker_key or str.strip
+        self._lock = threading.RLock()
+        # (date, ticker) -> (파일 경로, 위치). JSONL 은 (offset, length), parquet 은 (row, -1)
+        self._index: Dict[Tuple[str, str], Tuple[str, int, int]] = {}
+        self._dates_by_ticker: Dict[str, List[str]] = {}
+        self._files: Dict[str, Tuple[float, int]] = {}  # path -> (mtime, size)
+        self._keys_by_file: Dict[str, List[Tuple[str, str]]] = {}
+        self._handles: Dict[str, object] = {}
+        self._tables: Dict[str, object] = {}
+        self._last_checked = 0.0
+        self.reload()
+
+    def get(self, date: str, ticker: str) -> Optional[str]:
+        self._maybe_reload()
+        with self._lock:
+            key = (date, self._ticker_key(ticker))
+            location = self._index.get(key)
+            if location is None:
+                return None
+            return self._read(key, location)
+
+    def latest_date(self, ticker: str, on_or_before: Optional[str] = None) -> Optional[str]:
+        """ticker 의 가장 최근 날짜. on_or_before 를 주면 그 날짜 이전 중 가장 최근 날짜를 찾습니다."""
+        self._maybe_reload()
+        dates = self._dates_by_ticker.get(self._ticker_key(ticker))
+        if not dates:
+            return None
+        if on_or_before is None:
+            return dates[-1]
+        i = bisect.bisect_right(dates, on_or_before)
+        return dates[i - 1] if i > 0 else None
+
+    def get_latest(self, ticker: str, on_or_before: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        date = self.latest_date(ticker, on_or_before)
+        if date is None:
+            return None
+        body = self.get(date, ticker)
+        return (date, body) if body is not None else None
+
+    def get_range(self, ticker: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """start_date <= date <= end_date 인 (date, 본문) 목록을 날짜순으로 반환합니다."""
+        self._maybe_reload()
+        ticker = self._ticker_key(ticker)
+        dates = self._dates_by_ticker.get(ticker, [])
+        lo = bisect.bisect_left(dates, start_date)
+        hi = bisect.bisect_right(dates, end_date)
+        items = []
+        with self._lock:
+            for date in dates[lo:hi]:
+                location = self._index.get((date, ticker))
+                body = self._read((date, ticker), location) if location is not None else None
+                if body is not None:
+                    items.append((date, body))
+        return items
+
+    def tickers(self) -> List[str]:
+        self._maybe_reload()
+        return sorted(self._dates_by_ticker)
+
+    def stats(self) -> Dict[str, int]:
+        return {"files": len(self._files), "entries": len(self._index), "tickers": len(self._dates_by_ticker)}
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._last_checked >= self.reload_interval:
+            self.reload()
+
+    def reload(self):
+        """디렉터리를 훑어 새로 생기거나 바뀐 파일만 다시 인덱싱하고, 사라진 파일은 인덱스에서 뺍니다."""
+        with self._lock:
+            self._last_checked = time.monotonic()
+            current = {}
+            if os.path.isdir(self.content_dir):
+                for entry in os.scandir(self.content_dir):
+                    if entry.is_file() and entry.name.endswith((".jsonl", ".parquet")):
+                        stat = entry.stat()
+                        current[entry.path] = (stat.st_mtime, stat.st_size)
+
+            changed = False
+            for path in list(self._files):
+                if path not in current or current[path] != self._files[path]:
+                    self._unload(path)
+                    changed = True
+            for path in sorted(current):
+                if path not in self._files:
+                    self._load(path)
+                    self._files[path] = current[path]
+                    changed = True
+            if changed:
+                self._rebuild_dates()
+
+    def _load(self, path: str):
+        # 인덱싱 도중 실패해도 _unload 가 이미 넣은 항목을 지울 수 있도록 키를 넣는 즉시 기록합니다.
+        keys: List[Tuple[str, str]] = []
+        self._keys_by_file[path] = keys
+        try:
+            if path.endswith(".jsonl"):
+                self._load_jsonl(path, keys)
+            elif pq is not None:
+                self._load_parquet(path, keys)
+            else:
+                logger.warning("pyarrow 가 없어 parquet 파일을 건너뜁니다: %s", path)
+        except Exception as e:
+            logger.warning("콘텐츠 파일을 읽지 못했습니다 %s: %s", path, e)
+
+    def _record_key(self, record: object) -> Tuple[str, str]:
+        if not isinstance(record, dict):
+            raise ValueError("JSON 객체가 아닙니다")
+        return str(record["date"]), self._ticker_key(str(record["ticker"]))
+
+    def _load_jsonl(self, path: str, keys: List[Tuple[str, str]]):
+        f = open(path, "rb")
+        self._handles[path] = f
+        offset = 0
+        for line in iter(f.readline, b""):
+            length = len(line)
+            if line.strip():
+                try:
+                    key = self._record_key(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    # 아직 쓰는 중인 마지막 줄일 수 있습니다. 파일이 바뀌면 다시 인덱싱됩니다.
+                    logger.warning("잘못된 콘텐츠 줄을 건너뜁니다 %s:%d", path, offset)
+                else:
+                    self._index[key] = (path, offset, length)
+                    keys.append(key)
+            offset += length
+
+    def _load_parquet(self, path: str, keys: List[Tuple[str, str]]):
+        table = pq.read_table(path, memory_map=True)
+        self._tables[path] = table
+        for row, (date, ticker) in enumerate(zip(table.column("date").to_pylist(), table.column("ticker").to_pylist())):
+            if date is None or ticker is None:
+                continue
+            key = (str(date), self._ticker_key(str(ticker)))
+            self._index[key] = (path, row, -1)
+            keys.append(key)
+
+    def _unload(self, path: str):
+        for key in self._keys_by_file.pop(path, []):
+            if self._index.get(key, (None,))[0] == path:
+                del self._index[key]
+        handle = self._handles.pop(path, None)
+        if handle is not None:
+            handle.close()
+        self._tables.pop(path, None)
+        self._files.pop(path, None)
+
+    def _rebuild_dates(self):
+        dates_by_ticker: Dict[str, List[str]] = {}
+        for date, ticker in self._index:
+            dates_by_ticker.setdefault(ticker, []).append(date)
+        for dates in dates_by_ticker.values():
+            dates.sort()
+        self._dates_by_ticker = dates_by_ticker
+
+    def _read(self, key: Tuple[str, str], location: Tuple[str, int, int]) -> Optional[str]:
+        """
+        reload 가 파일을 닫지 않도록 호출하는 쪽에서 self._lock 을 잡고 부릅니다.
+        mmap 과 달리 pread 는 파일이 줄어들어도 짧게 읽을 뿐이라, 제자리에서 잘린 파일 때문에 프로세스가 죽지 않습니다.
+        """
+        path, position, length = location
+        if length < 0:
+            return self._tables[path].column("body")[position].as_py()
+        try:
+            record = json.loads(os.pread(self._handles[path].fileno(), length, position))
+            if self._record_key(record) != key:
+                return None
+            return record["body"]
+        except (ValueError, KeyError, TypeError, OSError):
+            logger.warning("다음 reload 전에 바뀐 콘텐츠 줄을 건너뜁니다 %s:%d", path, position)
+            return None
@@ -1,17 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable, Awaitable, Tuple
+from collections import defaultdict
 import asyncio
+import json
+import logging
+import math
+import sys
+import time
 import uvicorn
-from fastmcp import Client
 from urllib.parse import urlencode
 from dotenv import load_dotenv
 import os
 from datetime import datetime, timedelta
+from contextlib import asynccontextmanager, AsyncExitStack
 load_dotenv()
-from google import genai
-from langchain.output_parsers import PydanticOutputParser
 from fastapi.middleware.cors import CORSMiddleware
+from mcp_pool import MCPSessionPool, PoolClosedError
+from response_cache import ResponseCache, MemoryCacheBackend, SQLiteCacheBackend, make_cache_key
+from tool_cache import ToolResultCache
+from stream_parser import QuestionStreamParser
+from structured_output import StructuredOutputError, format_instructions, parse_structured
+from prompt_builder import build_question_prompt, build_market_context_prompt, compact_profile, log_token_usage
+from market_context import MarketContext, MarketSummary, context_cache_key
+from alias_index import default_index, normalize_keyword
+from pregen import PregenScheduler, INVESTOR_LEVELS, build_segment_profiles, segment_id
+import metrics
+from metrics import stage
+from admission import (
+    BackendLimiter, OverloadedError, DeadlineExceededError,
+    deadline_scope, remaining, with_deadline, retry_with_backoff,
+)
+
+# google.genai, fastmcp 는 import 에만 1초 안팎이 걸려 워커 기동이 늦어지므로 lifespan/첫 사용 시점에 import 합니다.
+if TYPE_CHECKING:
+    from fastmcp import Client
+    from google.genai import types as genai_types
+
+logger = logging.getLogger(__name__)
 
 smithery_key = os.getenv("SMITHERY_API_KEY")
 
@@ -22,7 +49,8 @@ smithery_key = os.getenv("SMITHERY_API_KEY")
 
 naver_news_base_url = "https://server.smithery.ai/@isnow890/naver-search-mcp/mcp"
 params = {"api_key": smithery_key}
-naver_news_url = f"{naver_news_base_url}?{urlencode(params)}"
+# NAVER_MCP_URL 로 다른 서버(로컬 벤치마크용 bench/fake_naver_mcp.py 등)를 지정할 수 있습니다.
+naver_news_url = os.getenv("NAVER_MCP_URL") or f"{naver_news_base_url}?{urlencode(params)}"
 
 # yahoo_base_url = "https://server.smithery.ai/@hwangwoohyun-nav/yahoo-finance-mcp/mcp"
 # params = {"api_key": smithery_key}
@@ -30,15 +58,284 @@ naver_news_url = f"{naver_news_base_url}?{urlencode(params)}"
 
 # yahoo_client = Client(yahoo_url)
 # google_client = Client(google_news_url)
-naver_client = Client(naver_news_url)
-internal_client = Client("mcp_main.py")
-gemini_client = genai.Client()
+mcp_pool_size = int(os.getenv("MCP_POOL_SIZE", "4"))
+mcp_health_check_interval = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+
+# 요청마다 연결/서브프로세스를 새로 만들지 않도록 미리 연결해 둔 세션을 빌려 씁니다.
+# 기동 시에는 백엔드별로 이 수만큼만 연결을 기다리고, 나머지 세션은 백그라운드에서 연결합니다.
+mcp_pool_min_ready = int(os.getenv("MCP_POOL_MIN_READY", "1"))
+
+def mcp_client(target: str) -> "Client":
+    from fastmcp import Client
+    return Client(target)
+
+naver_pool = MCPSessionPool(
+    "naver",
+    lambda: mcp_client(naver_news_url),
+    size=mcp_pool_size,
+    health_check_interval=mcp_health_check_interval,
+)
+internal_pool = MCPSessionPool(
+    "internal",
+    lambda: mcp_client("mcp_main.py"),
+    size=mcp_pool_size,
+    health_check_interval=mcp_health_check_interval,
+)
+# lifespan 에서 만듭니다. 벤치마크처럼 미리 다른 클라이언트를 넣어 두면 그대로 씁니다.
+gemini_client = None
+
+def create_gemini_client():
+    from google import genai
+    return genai.Client()
+
+# 같은 키워드/사용자 프로필/날짜 구간의 질문은 TTL 동안 재사용합니다.
+response_cache_sqlite_path = os.getenv("RESPONSE_CACHE_SQLITE_PATH")
+response_cache_max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+response_cache_bucket_minutes = int(os.getenv("RESPONSE_CACHE_DATE_BUCKET_MINUTES", "1440"))
+response_cache = ResponseCache(
+    SQLiteCacheBackend(response_cache_sqlite_path, max_entries=response_cache_max_entries)
+    if response_cache_sqlite_path
+    else MemoryCacheBackend(max_entries=response_cache_max_entries),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "600")),
+)
+
+# "테슬라", "Tesla", "tsla", "테슬러" 를 같은 종목 ID(TSLA)로 바꿔 캐시 키, 콘텐츠 조회, 프롬프트에 일관되게 씁니다.
+alias_index = default_index()
+
+# 키워드의 시장 정보 요약은 사용자와 무관하므로 (키워드, 날짜 구간) 마다 한 번만 도구를 호출해 만들고 공유합니다.
+context_cache_bucket_minutes = int(os.getenv("CONTEXT_CACHE_DATE_BUCKET_MINUTES", "60"))
+context_cache = ResponseCache(
+    MemoryCacheBackend(max_entries=int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", "500"))),
+    ttl=float(os.getenv("CONTEXT_CACHE_TTL", "1800")),
+)
+# 도구 호출이 모두 실패해 데이터 없이 만든 요약은 세션이 복구되면 바로 다시 만들도록 짧게만 캐시합니다.
+context_degraded_cache_ttl = float(os.getenv("CONTEXT_DEGRADED_CACHE_TTL", "60"))
+# 2단계(개인화)는 도구 없이 짧은 프롬프트만 처리하므로 더 가벼운 설정을 쓸 수 있습니다.
+personalize_model = os.getenv("PERSONALIZE_MODEL", "gemini-2.5-flash")
+personalize_thinking_budget = int(os.getenv("PERSONALIZE_THINKING_BUDGET", "0"))
+
+def parse_tool_ttls(value: str) -> Dict[str, float]:
+    """"search_news=300,content=3600" 형식의 도구별 TTL 설정을 읽습니다."""
+    ttls = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, ttl = item.split("=", 1)
+            ttls[name.strip()] = float(ttl)
+    return ttls
+
+# 여러 사용자가 같은 키워드로 반복하는 MCP 도구 호출 결과를 공유합니다.
+tool_cache = ToolResultCache(
+    default_ttl=float(os.getenv("TOOL_CACHE_DEFAULT_TTL", "300")),
+    tool_ttls=parse_tool_ttls(os.getenv("TOOL_CACHE_TTLS", "content=3600")),
+    max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES", str(50 * 1024 * 1024))),
+    observer=metrics.record_tool_call,
+    call_timeout=remaining,
+)
+
+# 백엔드별 동시 실행 수와 대기열 크기를 제한해, 과부하 시 모든 요청이 함께 느려지는 대신 빠르게 거절합니다.
+admission_queue_timeout = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+admission_max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+gemini_limiter = BackendLimiter(
+    "gemini",
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+    max_queue=admission_max_queue,
+    queue_timeout=admission_queue_timeout,
+)
+# MCP 는 세션 하나를 요청 하나가 쓰므로 풀 크기만큼만 동시에 들여보냅니다.
+naver_limiter = BackendLimiter("naver", mcp_pool_size, admission_max_queue, admission_queue_timeout)
+internal_limiter = BackendLimiter("internal", mcp_pool_size, admission_max_queue, admission_queue_timeout)
+request_deadline = float(os.getenv("REQUEST_DEADLINE", "30"))
+gemini_max_retries = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+retry_base_delay = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+
+def env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+async def pregenerate_questions(keyword: str, user_data: Any, current_date: datetime) -> List[str]:
+    """사전 생성 결과를 응답 캐시에도 넣어 같은 프로필의 /questions 요청이 바로 응답받도록 합니다."""
+    with deadline_scope(request_deadline):
+        questions = await generate_stock_questions(keyword, user_data, current_date)
+    await response_cache.set(question_cache_key(keyword, user_data, current_date), questions)
+    return questions
+
+# 홈 화면용 인기 키워드 x 투자자 세그먼트 질문을 백그라운드에서 미리 생성합니다.
+pregen_enabled = os.getenv("PREGEN_ENABLED", "true").lower() in ("1", "true", "yes")
+pregen_reserved_sessions = int(os.getenv("PREGEN_RESERVED_SESSIONS", "1"))
+pregen_reserved_gemini_slots = int(os.getenv("PREGEN_RESERVED_GEMINI_SLOTS", "1"))
+# 남겨둘 수가 풀/동시 실행 한도 이상이면 조건이 영원히 참이 될 수 없어 사전 생성이 멈춘 채 running 으로 남습니다.
+# 둘 다 유효한 설정이므로 하나는 사전 생성이 쓸 수 있도록 줄여서 씁니다.
+if pregen_reserved_sessions >= mcp_pool_size:
+    logger.warning(
+        "PREGEN_RESERVED_SESSIONS(%d) 가 MCP_POOL_SIZE(%d) 이상이라 %d 로 줄여 씁니다.",
+        pregen_reserved_sessions, mcp_pool_size, mcp_pool_size - 1,
+    )
+    pregen_reserved_sessions = mcp_pool_size - 1
+if pregen_reserved_gemini_slots >= gemini_limiter.max_concurrency:
+    logger.warning(
+        "PREGEN_RESERVED_GEMINI_SLOTS(%d) 가 GEMINI_MAX_CONCURRENCY(%d) 이상이라 %d 로 줄여 씁니다.",
+        pregen_reserved_gemini_slots, gemini_limiter.max_concurrency, gemini_limiter.max_concurrency - 1,
+    )
+    pregen_reserved_gemini_slots = gemini_limiter.max_concurrency - 1
+
+def pregen_can_run() -> bool:
+    """
+    live 요청용으로 MCP 세션과 Gemini 동시 실행 자리를 남겨둘 수 있을 때만 사전 생성을 진행합니다.
+    개인화 단계는 MCP 없이 Gemini 만 쓰므로 Gemini 대기열도 함께 봅니다.
+    """
+    gemini = gemini_limiter.stats()
+    return (
+        naver_pool.stats()["idle"] > pregen_reserved_sessions
+        and internal_pool.stats()["idle"] > pregen_reserved_sessions
+        and gemini["waiting"] == 0
+        and gemini["in_flight"] + pregen_reserved_gemini_slots < gemini["max_concurrency"]
+    )
+
+pregen_scheduler = PregenScheduler(
+    pregenerate_questions,
+    keywords=[alias_index.keyword_id(keyword) for keyword in env_list("PREGEN_KEYWORDS", "테슬라,오라클")],
+    profiles=build_segment_profiles(INVESTOR_LEVELS, env_list("PREGEN_SECTORS", "반도체,자동차,IT")),
+    interval=float(os.getenv("PREGEN_INTERVAL", "1800")),
+    max_per_minute=float(os.getenv("PREGEN_MAX_PER_MINUTE", "6")),
+    can_run=pregen_can_run,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global gemini_client
+    started = time.perf_counter()
+    # genai import/클라이언트 생성은 스레드에서 하여 MCP 서브프로세스 기동/핸드셰이크 대기와 겹치게 합니다.
+    gemini_task = asyncio.to_thread(create_gemini_client) if gemini_client is None else None
+    results = await asyncio.gather(
+        naver_pool.start(min_ready=mcp_pool_min_ready),
+        internal_pool.start(min_ready=mcp_pool_min_ready),
+        *([gemini_task] if gemini_task is not None else []),
+    )
+    if gemini_task is not None:
+        gemini_client = results[-1]
+    logger.info("lifespan 준비 완료: %.2fs", time.perf_counter() - started)
+    if pregen_enabled:
+        pregen_scheduler.start()
+    yield
+    await pregen_scheduler.stop()
+    await asyncio.gather(naver_pool.close(), internal_pool.close())
 
 app = FastAPI(
     title="주식 질문 생성 API",
     description="키워드를 입력하면 주식앱에서 나올법한 질문을 생성하는 API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+)
+
+metrics.registry.gauge_callback(
+    "mcp_pool_sessions", "MCP 세션 풀 상태별 세션 수", ("pool", "state"),
+    lambda: {
+        (pool.name, state): pool.stats()[state]
+        for pool in (naver_pool, internal_pool)
+        for state in ("idle", "in_use", "waiting", "connected")
+    },
+)
+def cache_events(cache: ResponseCache) -> Dict[Tuple[str], int]:
+    """스크랩 한 번에 stats() 를 한 번만 부릅니다."""
+    stats = cache.stats()
+    return {(event,): stats[event] for event in ("hits", "misses", "coalesced", "errors", "evictions")}
+
+metrics.registry.gauge_callback(
+    "response_cache_events_total", "질문 응답 캐시 누적 이벤트 수", ("event",),
+    lambda: cache_events(response_cache),
+    metric_type="counter",
+)
+metrics.registry.gauge_callback(
+    "market_context_cache_events_total", "시장 정보 요약 캐시 누적 이벤트 수", ("event",),
+    lambda: cache_events(context_cache),
+    metric_type="counter",
+)
+metrics.registry.gauge_callback(
+    "admission_backend_requests", "백엔드별 실행 중/대기 중 요청 수", ("backend", "state"),
+    lambda: {
+        (limiter.name, state): limiter.stats()[state]
+        for limiter in (gemini_limiter, naver_limiter, internal_limiter)
+        for state in ("in_flight", "waiting")
+    },
 )
+metrics.registry.gauge_callback(
+    "admission_rejections_total", "대기열이 가득 차거나 대기 시간을 넘겨 거절한 요청 수", ("backend",),
+    lambda: {(limiter.name,): limiter.rejected for limiter in (gemini_limiter, naver_limiter, internal_limiter)},
+    metric_type="counter",
+)
+metrics.registry.gauge_callback(
+    "tool_cache_hit_rate", "MCP 도구별 결과 캐시 히트율", ("tool",),
+    lambda: {(tool,): counts["hit_rate"] for tool, counts in tool_cache.stats()["tools"].items()},
+)
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """요청별 처리 시간/상태 코드를 기록하고, 단계별 소요 시간을 Server-Timing 헤더로 붙입니다."""
+    trace = metrics.start_trace()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # 실제 URL 대신 라우트 템플릿으로 라벨을 붙입니다. 임의 URL 스캔이 라벨 조합(과 샘플 버퍼)을 무한히 늘리지 않도록
+    # 매칭되지 않은 요청은 하나로 모읍니다.
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    metrics.REQUEST_DURATION.observe(elapsed, path=path)
+    metrics.REQUESTS.inc(path=path, status=response.status_code)
+    if trace:
+        response.headers["Server-Timing"] = metrics.server_timing_header(trace)
+    return response
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"요청이 많아 잠시 후 다시 시도해주세요: {str(exc)}"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+@app.exception_handler(StructuredOutputError)
+async def structured_output_handler(request: Request, exc: StructuredOutputError):
+    logger.warning("모델 응답 해석 실패: %s (응답: %s)", exc, exc.snippet())
+    return JSONResponse(status_code=502, content={"detail": f"모델 응답을 해석할 수 없습니다: {str(exc)}"})
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_handler(request: Request, exc: DeadlineExceededError):
+    return JSONResponse(status_code=504, content={"detail": f"질문 생성 시간이 초과되었습니다: {str(exc)}"})
+
+# 백엔드 오류 타입. 해당 라이브러리를 import 하지 않고(기동 시간) 이미 로드된 경우에만 isinstance 로 확인합니다.
+# MCP 세션의 스트림이 닫히면(서브프로세스 종료 등) anyio 오류가 그대로 올라옵니다.
+_UNAVAILABLE_ERROR_TYPES = (
+    ("anyio", "ClosedResourceError"),
+    ("anyio", "BrokenResourceError"),
+)
+_BACKEND_ERROR_TYPES = (
+    ("google.genai.errors", "APIError"),
+    ("mcp.shared.exceptions", "McpError"),
+    ("httpx", "HTTPError"),
+)
+
+def _is_instance(exc: Exception, types: Tuple[Tuple[str, str], ...]) -> bool:
+    for module_name, type_name in types:
+        module = sys.modules.get(module_name)
+        if module is not None and isinstance(exc, getattr(module, type_name)):
+            return True
+    return False
+
+def error_detail(exc: Exception) -> str:
+    """메시지 없는 예외(anyio 오류 등)도 원인을 알 수 있도록 타입 이름을 대신 씁니다."""
+    return str(exc) or type(exc).__name__
+
+def error_status(exc: Exception) -> int:
+    """
+    엔드포인트에서 잡은 오류의 HTTP 상태 코드. 세션 풀/연결 불가는 503, Gemini/MCP 가 재시도 후에도 실패하면 502,
+    잘못된 입력(ValueError)만 400, 그 밖의 서버 오류는 500 입니다.
+    """
+    if isinstance(exc, (PoolClosedError, ConnectionError, asyncio.TimeoutError)) or _is_instance(exc, _UNAVAILABLE_ERROR_TYPES):
+        return 503
+    if _is_instance(exc, _BACKEND_ERROR_TYPES):
+        return 502
+    if isinstance(exc, ValueError):
+        return 400
+    return 500
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +353,39 @@ class QuestionResponse(BaseModel):
     keyword: str
     questions: List[str]  # 주식앱에서 나올법한 질문들
 
+# 질문 생성은 Gemini response_schema 로 형식을 강제하므로 짧은 안내만 넣습니다.
+question_format_instructions = '{"keyword": 키워드, "questions": [질문 5개]} 형식의 JSON 만 출력하세요.'
+# 시장 정보 요약은 도구 호출과 response_schema 를 함께 쓸 수 없어 스키마를 프롬프트에 넣고 직접 검증합니다.
+market_context_format_instructions = format_instructions(MarketSummary)
+
+class BatchRequest(BaseModel):
+    items: List[KeywordRequest]
+    concurrency: Optional[int] = None  # 동시에 생성할 항목 수 (기본값 BATCH_CONCURRENCY)
+
+class BatchItemResult(BaseModel):
+    index: int
+    keyword: str
+    questions: Optional[List[str]] = None
+    error: Optional[str] = None
+    elapsed_ms: float
+
+class BatchStats(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    keywords: int
+    concurrency: int
+    elapsed_seconds: float
+    items_per_second: float
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    stats: BatchStats
+
+batch_default_concurrency = int(os.getenv("BATCH_CONCURRENCY", "8"))
+batch_max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
 @app.get("/")
 async def root():
     return {"message": "주식 질문 생성 API에 오신 것을 환영합니다!"}
@@ -67,127 +397,401 @@ async def generate_questions(keyword_request: KeywordRequest):
     키워드를 기반으로 주식앱에서 나올법한 질문을 생성합니다.
     """
     try:
-        keyword = keyword_request.keyword.upper()
+        # 응답에는 요청한 키워드를 돌려주고, 정규 종목 ID 는 캐시 키/콘텐츠 조회 안에서만 씁니다.
+        keyword = normalize_keyword(keyword_request.keyword)
         user_data = keyword_request.user_data
         
-        # LLM을 통한 질문 생성
-        questions = await generate_stock_questions(keyword, user_data, datetime.now())
+        # LLM을 통한 질문 생성 (캐시에 없을 때만)
+        questions = await get_questions(keyword, user_data, datetime.now())
         
         return QuestionResponse(
             keyword=keyword,
             questions=questions
         )
         
+    except (OverloadedError, DeadlineExceededError, StructuredOutputError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=error_status(e), detail=f"질문 생성 중 오류가 발생했습니다: {error_detail(e)}")
+
+@app.get("/questions/pregenerated")
+async def get_pregenerated_questions(keyword: str, level: str, sector: str):
+    """
+    사전 생성된 세그먼트(투자 수준 x 관심섹터) 질문을 LLM 호출 없이 반환합니다.
+    """
+    entry = pregen_scheduler.get(alias_index.keyword_id(keyword), segment_id(level, sector))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="사전 생성된 질문이 없습니다.")
+    return {
+        "keyword": normalize_keyword(keyword),
+        "segment": entry["segment"],
+        "questions": entry["questions"],
+        "generated_at": entry["generated_at"].isoformat(),
+    }
+
+@app.get("/pregen/status")
+async def pregen_status():
+    return {"enabled": pregen_enabled, **pregen_scheduler.status()}
+
+@app.post("/questions/stream")
+async def generate_questions_stream(keyword_request: KeywordRequest):
+    """
+    /questions 와 같은 질문을 server-sent events 로 스트리밍합니다.
+    질문이 하나씩 완성될 때마다 `question` 이벤트를 보내고, 마지막에 전체 질문과 소요 시간을 담은 `done` 이벤트를 보냅니다.
+    """
+    keyword = normalize_keyword(keyword_request.keyword)
+    return StreamingResponse(
+        stream_question_events(keyword, keyword_request.user_data, datetime.now()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/questions/batch", response_model=BatchResponse)
+async def generate_questions_batch(batch_request: BatchRequest):
+    """
+    여러 (키워드, 사용자 정보) 항목의 질문을 제한된 동시성으로 한 번에 생성합니다.
+    실패한 항목은 error 에 사유를 담고 나머지 항목은 그대로 반환합니다.
+    """
+    if len(batch_request.items) > batch_max_items:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {batch_max_items}개 항목까지 요청할 수 있습니다.")
+
+    concurrency = min(max(batch_request.concurrency or batch_default_concurrency, 1), batch_max_concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    current_date = datetime.now()
+    results: List[Optional[BatchItemResult]] = [None] * len(batch_request.items)
+
+    # 같은 키워드 항목끼리 묶어, 키워드별 첫 항목이 도구 캐시를 채운 뒤 나머지를 생성합니다.
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for index, item in enumerate(batch_request.items):
+        groups[alias_index.keyword_id(item.keyword)].append(index)
+
+    async def run_item(index: int):
+        keyword = normalize_keyword(batch_request.items[index].keyword)
+        user_data = batch_request.items[index].user_data
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                questions = await get_questions(keyword, user_data, current_date)
+                results[index] = BatchItemResult(
+                    index=index, keyword=keyword, questions=questions,
+                    elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+                )
+            except Exception as e:
+                results[index] = BatchItemResult(
+                    index=index, keyword=keyword, error=f"질문 생성 중 오류가 발생했습니다: {error_detail(e)}",
+                    elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+                )
+
+    async def run_group(indices: List[int]):
+        await run_item(indices[0])
+        await asyncio.gather(*(run_item(index) for index in indices[1:]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_group(indices) for indices in groups.values()))
+    elapsed = time.perf_counter() - started
+
+    succeeded = sum(1 for result in results if result.error is None)
+    return BatchResponse(
+        results=results,
+        stats=BatchStats(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            keywords=len(groups),
+            concurrency=concurrency,
+            elapsed_seconds=round(elapsed, 3),
+            items_per_second=round(len(results) / elapsed, 3) if elapsed > 0 else 0.0,
+        ),
+    )
+
+@app.get("/context")
+async def get_context(keyword: str, refresh: bool = False):
+    """질문 생성에 쓰이는 키워드별 시장 정보 요약을 확인합니다. refresh=true 면 캐시를 무시하고 다시 만듭니다."""
+    current_date = datetime.now()
+    entity_id = alias_index.keyword_id(keyword)
+    try:
+        if refresh:
+            with deadline_scope(request_deadline):
+                context = await build_market_context(entity_id, current_date)
+            await context_cache.set(context_cache_key(entity_id, current_date, context_cache_bucket_minutes), context, context_ttl(context))
+        else:
+            context = await get_market_context(entity_id, current_date)
+    except (OverloadedError, DeadlineExceededError, StructuredOutputError):
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"질문 생성 중 오류가 발생했습니다: {str(e)}")
+        raise HTTPException(status_code=error_status(e), detail=f"시장 정보 생성 중 오류가 발생했습니다: {error_detail(e)}")
+    return {**context, "keyword": normalize_keyword(keyword)}
+
+@app.get("/keywords/suggest")
+async def suggest_keywords(q: str, limit: int = 10):
+    """입력 중인 키워드의 종목 자동완성. 한글명/영문명/티커/흔한 오타를 접두사로 찾고 LLM 은 호출하지 않습니다."""
+    return {
+        "query": q,
+        "items": [entity.model_dump(exclude={"aliases", "rank"}) for entity in alias_index.suggest(q, limit)],
+    }
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "market-analysis-api"}
 
-async def generate_stock_questions(keyword: str, user_data: str, current_date: datetime) -> List[str]:
-    async with naver_client, internal_client:
-        """
-        MCP 데이터를 기반으로 Gemini를 사용하여 주식앱에서 나올법한 질문을 생성합니다.
-        """ 
-        
-        parser = PydanticOutputParser(pydantic_object=QuestionResponse)
-        format_instructions = parser.get_format_instructions()
-
-        # 4. MCP 데이터를 기반으로 프롬프트 생성
-        prompt1= f"""
-## #1. 페르소나
-당신은 카카오페이증권에서 운영하는 AI 어시스턴트입니다. 
-당신의 핵심 임무는 고객의 투자 수준과 관심사를 파악하여, 실시간으로 수집된 데이터를 기반으로 개인화된 핵심 질문을 생성하여 투자 결정에 도움을 주는 것입니다. 
----
-
-## #2. 지시사항
-
-고객이 입력한 `{keyword}`와 고객 정보(`{user_data}`), 그리고 `{current_date}` 기준의 실시간 데이터를 종합적으로 분석하여, **해당 고객이 앱에서 즉시 클릭하고 싶을 만한 개인화된 질문 5개를 생성**하세요.
-
-생성될 질문은 아래 3가지 카테고리를 균형 있게 포함해야 합니다.
-
-*   **카테고리 1: 시황/경제 (Market/Economy):** 금리, 환율, 유가, FOMC, CPI 등 거시 경제 지표와 관련된 질문
-*   **카테고리 2: 종목/산업 (Stock/Industry):** 특정 종목의 주가 변동, 실적 발표, 신기술, 산업 동향 등과 관련된 질문
-*   **카테고리 3: 개념/용어 (Concept/Term):** 데이터에 등장하는 중요한 투자 용어 또는 경제 현상에 대한 설명 요청 질문
-
----
-
-## #3. 사고 과정
-
-다음 6단계의 사고 과정을 반드시 따르세요.
-
-*   **1단계: 고객 수준 및 관심사 파악**
-    *   `{user_data}`를 분석하여 고객의 투자 경험 수준, 보유 포트폴리오, 거래 패턴, 관심 업종/종목 등을 파악합니다.
-    *   고객이 초보자인지, 중급자인지, 고급자인지 판단하고, 그에 맞는 질문의 난이도와 깊이를 결정합니다.
-    *   고객의 보유 종목이나 관심 업종과 `{keyword}`의 연관성을 분석합니다.
-
-*   **2단계: 핵심 정보 식별**
-    *   먼저, 고객이 입력한 `{keyword}`의 의미를 파악합니다.
-    *   `{current_date}` 기준으로 실시간 데이터 전체를 훑어보며 가장 중요하고 반복적으로 언급되는 주제, 종목명, 경제 이벤트, 수치(예: 실적, 금리) 등을 식별합니다.
-
-*   **3단계: 정보 간 연관성 분석**
-    *   `{keyword}`, 고객 정보, 그리고 2단계에서 식별된 핵심 정보들 간의 관계를 분석합니다.
-    *   예를 들어, `{keyword}`가 '엔비디아'이고 고객이 AI 관련 종목을 보유하고 있다면, 엔비디아의 주가 정보(`stock_info`), 실적 관련 뉴스(`top_news`), 그리고 고객의 포트폴리오에 미치는 영향을 연결하여 분석합니다.
-
-*   **4단계: 고객 수준별 질문 초안 생성**
-    *   분석된 연관성과 고객 수준을 바탕으로 위에서 정의된 3가지 카테고리(시황/경제, 종목/산업, 개념/용어)에 맞춰 각각 2~3개의 질문 초안을 만듭니다.
-    *   고객의 수준에 따라 질문의 복잡도와 전문성을 조절합니다:
-        *   **초보자**: 기본적인 개념 설명과 단순한 시장 동향 질문
-        *   **중급자**: 구체적인 분석과 전략적 관점의 질문
-        *   **고급자**: 심화된 분석과 전문적인 투자 전략 질문
-    *   예시
-        *   (초보자-시황) "오늘 FOMC 발표가 뭔지, 주식에 어떤 영향이 있을까?"
-        *   (중급자-종목) "엔비디아 주가 급등, AI 칩 수요 증가가 실적에 미치는 영향은?"
-        *   (고급자-개념) "어닝 서프라이즈의 통계적 유의성과 포트폴리오 리밸런싱 전략은?"
-
-*   **5단계: 질문 고도화 및 개인화**
-    *   초안으로 만들어진 질문들을 고객의 수준과 관심사에 맞게 개인화하여 다듬습니다.
-    *   고객의 보유 종목이나 관심 업종을 언급하여 관련성을 높입니다.
-    *   주식 앱 고객들에게 친근하게 다가갈 수 있는 어투를 사용합니다. (예: **"~궁금하지 않아?"**, **"~핵심만 알려줘"**, **"~어떻게 될까?"**, **"~이유가 뭐야?"**)
-    *   `{current_date}` 기준의 구체적인 사실(숫자, 이벤트명)을 포함하여 질문의 신뢰도와 시의성을 높입니다.
-
-*   **6단계: 최종 5개 질문 선정 (Select Final 5 Questions)**
-    *   개인화된 질문들 중에서 고객의 수준에 가장 적합하고, 시의성이 높으며, 카테고리 배분이 적절한 최종 5개의 질문을 선정합니다.
-
-—
-
-## #4. 입력 데이터
-
-### Keyword
-```
-{keyword}
-```
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return {
+        "request_deadline": request_deadline,
+        "backends": [limiter.stats() for limiter in (gemini_limiter, naver_limiter, internal_limiter)],
+    }
+
+@app.get("/pool/stats")
+async def pool_stats():
+    return {"naver": naver_pool.stats(), "internal": internal_pool.stats()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"responses": response_cache.stats(), "contexts": context_cache.stats(), "tools": tool_cache.stats()}
+
+def question_cache_key(keyword: str, user_data: Any, current_date: datetime) -> str:
+    """프롬프트에는 압축 프로필만 들어가므로, 프로필이 같은 사용자끼리 캐시를 공유하도록 압축 프로필로 키를 만듭니다."""
+    return make_cache_key(alias_index.keyword_id(keyword), compact_profile(user_data), current_date, response_cache_bucket_minutes)
+
+async def get_questions(keyword: str, user_data: Any, current_date: datetime) -> List[str]:
+    """응답 캐시를 거쳐 질문을 가져옵니다. 캐시에 없으면 같은 키의 동시 요청과 한 번의 생성을 공유합니다."""
+    cache_key = question_cache_key(keyword, user_data, current_date)
+    with deadline_scope(request_deadline):
+        return await with_deadline(
+            response_cache.get_or_compute(cache_key, lambda: generate_stock_questions(keyword, user_data, current_date)),
+            "questions",
+        )
 
-### User Info
-```
-{user_data}
-```
+def market_context_config(sessions: List[Any]) -> "genai_types.GenerateContentConfig":
+    """sessions 는 tool_cache.wrap() 으로 감싼 MCP 세션입니다."""
+    from google.genai import types
+    return types.GenerateContentConfig(temperature=0, tools=sessions)
+
+def question_generation_config() -> "genai_types.GenerateContentConfig":
+    from google.genai import types
+    return types.GenerateContentConfig(
+        temperature=0,
+        thinking_config=types.ThinkingConfig(thinking_budget=personalize_thinking_budget),
+        response_mime_type="application/json",
+        response_schema=QuestionResponse,
+    )
+
+def parse_questions(text: str) -> List[str]:
+    """
+    JSON 을 꺼내 QuestionResponse 로 검증합니다. 응답이 잘리거나 깨져 검증에 실패하면
+    "questions" 배열에서 완성된 질문만이라도 건지고, 그것도 없으면 StructuredOutputError 를 그대로 던집니다.
+    """
+    try:
+        return parse_structured(text, QuestionResponse).questions[:5]
+    except StructuredOutputError:
+        salvaged = QuestionStreamParser().feed(text or "")
+        if not salvaged:
+            raise
+        logger.warning("질문 응답 형식이 맞지 않아 완성된 질문 %d개만 사용합니다.", len(salvaged))
+        return salvaged[:5]
+
+async def acquire_mcp_clients(stack: AsyncExitStack):
+    """두 MCP 풀에서 세션을 하나씩 빌립니다. 반납은 stack 이 닫힐 때 합니다."""
+    with stage("session"):
+        await stack.enter_async_context(naver_limiter.slot())
+        naver_client = await with_deadline(stack.enter_async_context(naver_pool.acquire()), "naver MCP 세션")
+        await stack.enter_async_context(internal_limiter.slot())
+        internal_client = await with_deadline(stack.enter_async_context(internal_pool.acquire()), "internal MCP 세션")
+    return naver_client, internal_client
+
+async def call_gemini(call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    남은 마감 시간만큼만 기다리며 Gemini 를 호출하고, 일시적 오류는 지터 백오프로 재시도합니다.
+    재시도 후에도 429 면 클라이언트가 나중에 다시 시도하도록 OverloadedError(429) 로 바꿉니다.
+    동시 실행 제한(gemini_limiter.slot)은 스트림처럼 호출 뒤에도 점유가 이어질 수 있어 호출하는 쪽에서 잡습니다.
+    """
+    try:
+        return await retry_with_backoff(
+            lambda: with_deadline(call(), "gemini"),
+            attempts=gemini_max_retries + 1,
+            base_delay=retry_base_delay,
+            on_retry=lambda e: metrics.RETRIES.inc(backend="gemini", exception=type(e).__name__),
+        )
+    except Exception as e:
+        if getattr(e, "code", None) == 429:
+            raise OverloadedError("Gemini 요청 한도를 넘었습니다.", retry_after=gemini_limiter.retry_after(), status_code=429) from e
+        raise
 
-### Current Date
-```
-{current_date}
-```
+async def open_stream(start: Callable[[], Awaitable[Any]]) -> Tuple[Any, Any]:
+    """
+    스트림을 열고 첫 청크까지 받아 (첫 청크, 스트림) 을 반환합니다. 비어 있으면 첫 청크는 None 입니다.
+    generate_content_stream 은 첫 __anext__() 에서야 요청을 보내므로, 첫 청크까지 call_gemini 안에서 받아야
+    429/5xx 가 재시도되고 OverloadedError 로 바뀝니다.
+    """
+    stream = await start()
+    try:
+        return await stream.__anext__(), stream
+    except StopAsyncIteration:
+        return None, stream
+    except BaseException:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass
+        raise
+
+async def build_market_context(keyword: str, current_date: datetime) -> Dict[str, Any]:
+    """
+    1단계: MCP 도구(Naver 뉴스, 내부 콘텐츠)를 호출해 (키워드, 날짜) 의 시장 정보 요약을 만듭니다.
+    캐시(SQLite 포함)에 그대로 넣을 수 있도록 dict 로 반환합니다.
+    """
+    async with AsyncExitStack() as stack:
+        naver_client, internal_client = await acquire_mcp_clients(stack)
+        sessions = {
+            "naver": (naver_pool, naver_client, tool_cache.wrap(naver_client.session, "naver")),
+            "internal": (internal_pool, internal_client, tool_cache.wrap(internal_client.session, "internal")),
+        }
+        with stage("context_prompt"):
+            prompt = build_market_context_prompt(alias_index.label(keyword), current_date, market_context_format_instructions)
+        with stage("context_model"):
+            async with gemini_limiter.slot():
+                response = await call_gemini(lambda: gemini_client.aio.models.generate_content(
+                    model="gemini-2.5-flash",
+                    contents=prompt,
+                    config=market_context_config([session for _, _, session in sessions.values()]),
+                ))
+        # genai 는 도구 예외를 모델에게 넘기고 삼키므로, 세션 오류가 있었으면 반납할 때 점검하도록 풀에 알립니다.
+        for name, (pool, client, session) in sessions.items():
+            if session.errors:
+                logger.warning("%s MCP 도구 호출 %d/%d 회 실패 (keyword=%s)", name, session.errors, session.calls, keyword)
+                pool.report_failure(client)
+    calls = sum(session.calls for _, _, session in sessions.values())
+    errors = sum(session.errors for _, _, session in sessions.values())
+    metrics.record_tokens(log_token_usage(response, "context", keyword))
+    with stage("context_parse"):
+        summary = parse_structured(response.text, MarketSummary)
+    return MarketContext(
+        keyword=keyword,
+        date=current_date.strftime("%Y-%m-%d"),
+        degraded=calls > 0 and errors == calls,
+        **summary.model_dump(),
+    ).model_dump()
+
+def context_ttl(context: Dict[str, Any]) -> Optional[float]:
+    return context_degraded_cache_ttl if context.get("degraded") else None
+
+async def get_market_context(keyword: str, current_date: datetime) -> Dict[str, Any]:
+    """시장 정보 요약을 캐시에서 가져오고, 없으면 같은 키워드의 동시 요청과 한 번의 생성을 공유합니다."""
+    # 같은 종목의 여러 표기가 한 요약을 공유하므로 요약은 정규 종목 ID 로 만듭니다.
+    entity_id = alias_index.keyword_id(keyword)
+    cache_key = context_cache_key(entity_id, current_date, context_cache_bucket_minutes)
+    with stage("context"):
+        return await context_cache.get_or_compute(cache_key, lambda: build_market_context(entity_id, current_date), context_ttl)
 
-## 출력
-{format_instructions}
-"""
-        
-        response = await gemini_client.aio.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt1,
-                config=genai.types.GenerateContentConfig(
-                    temperature=0,
-                    tools=[naver_client.session, internal_client.session],
-                ),
-            )
-            
-        # 5. Gemini API 호출
-        content = response.text
-        parsed_response = parser.parse(content)
-        # 6. 질문 파싱
-
-        return parsed_response.questions[:5]
+async def generate_stock_questions(keyword: str, user_data: str, current_date: datetime) -> List[str]:
+    """
+    키워드의 시장 정보 요약(1단계, 공유 캐시)과 고객 프로필로 주식앱에서 나올법한 질문을 생성합니다(2단계, 도구 호출 없음).
+    """
+    market_context = await get_market_context(keyword, current_date)
+
+    with stage("prompt"):
+        prompt = build_question_prompt(alias_index.label(keyword), user_data, current_date, question_format_instructions, market_context)
+
+    with stage("model"):
+        async with gemini_limiter.slot():
+            response = await call_gemini(lambda: gemini_client.aio.models.generate_content(
+                model=personalize_model,
+                contents=prompt,
+                config=question_generation_config(),
+            ))
+    metrics.record_tokens(log_token_usage(response, "questions", keyword))
+
+    with stage("parse"):
+        # response_schema 를 주면 genai 가 pydantic 으로 검증한 결과를 parsed 에 넣어 줍니다.
+        if isinstance(response.parsed, QuestionResponse):
+            return response.parsed.questions[:5]
+        return parse_questions(response.text)
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def chunk_text(chunk: "genai_types.GenerateContentResponse") -> str:
+    """스트림 청크의 텍스트만 모읍니다. 도구 호출 청크는 빈 문자열입니다."""
+    if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+        return ""
+    return "".join(part.text for part in chunk.candidates[0].content.parts if part.text and not part.thought)
+
+async def stream_question_events(keyword: str, user_data: Any, current_date: datetime):
+    started = time.perf_counter()
+    elapsed_ms = lambda: round((time.perf_counter() - started) * 1000, 1)
+    timing = {"context_ms": None, "first_question_ms": None, "total_ms": None}
+    questions: List[str] = []
+
+    # 캐시 키 계산/조회 실패도 error 이벤트로 끝나도록 try 안에서 합니다. 밖에서 나면 빈 200 응답이 됩니다.
+    try:
+        cache_key = question_cache_key(keyword, user_data, current_date)
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            for index, question in enumerate(cached):
+                yield sse_event("question", {"index": index, "question": question})
+            timing["first_question_ms"] = timing["total_ms"] = elapsed_ms()
+            yield sse_event("done", {"keyword": keyword, "questions": cached, "cached": True, "timing": timing})
+            return
+
+        with deadline_scope(request_deadline):
+            async with AsyncExitStack() as stack:
+                market_context = await get_market_context(keyword, current_date)
+                timing["context_ms"] = elapsed_ms()
+                stream_parser = QuestionStreamParser()
+                with stage("prompt"):
+                    prompt = build_question_prompt(alias_index.label(keyword), user_data, current_date, question_format_instructions, market_context)
+                last_chunk = None
+
+                with stage("model"):
+                    await stack.enter_async_context(gemini_limiter.slot())
+                    # 재시도는 첫 청크를 받기 전까지만 합니다. 질문을 보내기 시작한 뒤에는 되돌릴 수 없습니다.
+                    chunk, stream = await call_gemini(lambda: open_stream(lambda: gemini_client.aio.models.generate_content_stream(
+                        model=personalize_model,
+                        contents=prompt,
+                        config=question_generation_config(),
+                    )))
+                    while chunk is not None:
+                        last_chunk = chunk
+                        for question in stream_parser.feed(chunk_text(chunk)):
+                            if len(questions) >= 5:
+                                break
+                            if timing["first_question_ms"] is None:
+                                timing["first_question_ms"] = elapsed_ms()
+                            yield sse_event("question", {"index": len(questions), "question": question})
+                            questions.append(question)
+                        try:
+                            chunk = await with_deadline(stream.__anext__(), "gemini 스트림")
+                        except StopAsyncIteration:
+                            chunk = None
+
+                # 사용량은 마지막 청크에 누적되어 옵니다.
+                metrics.record_tokens(log_token_usage(last_chunk, "questions/stream", keyword))
+
+                # 점진 파싱으로 질문을 하나도 못 찾았으면 전체 응답으로 다시 파싱합니다.
+                if not questions:
+                    with stage("parse"):
+                        parsed_questions = parse_questions(stream_parser.text)
+                    for question in parsed_questions:
+                        if timing["first_question_ms"] is None:
+                            timing["first_question_ms"] = elapsed_ms()
+                        yield sse_event("question", {"index": len(questions), "question": question})
+                        questions.append(question)
+
+        await response_cache.set(cache_key, questions)
+        timing["total_ms"] = elapsed_ms()
+        yield sse_event("done", {"keyword": keyword, "questions": questions, "cached": False, "timing": timing})
+    except OverloadedError as e:
+        timing["total_ms"] = elapsed_ms()
+        yield sse_event("error", {"detail": f"요청이 많아 잠시 후 다시 시도해주세요: {str(e)}", "retry_after": e.retry_after, "status": e.status_code, "timing": timing})
+    except Exception as e:
+        timing["total_ms"] = elapsed_ms()
+        yield sse_event("error", {"detail": f"질문 생성 중 오류가 발생했습니다: {error_detail(e)}", "status": error_status(e), "timing": timing})
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field
+
+from response_cache import date_bucket
+
+
+class NewsItem(BaseModel):
+    title: str
+    date: str = ""  # 기사 날짜 (YYYY-MM-DD)
+    summary: str = ""  # 한 문장 요약, 수치가 있으면 포함
+
+
+class MarketSummary(BaseModel):
+    """모델이 채우는 시장 정보 요약 본문입니다. 출력 스키마로 쓰므로 서버가 아는 키워드/날짜는 넣지 않습니다."""
+
+    summary: str = Field(description="키워드의 현재 시장 상황 2~3문장 요약")
+    key_facts: List[str] = Field(default_factory=list, description="주가 변동, 실적, 일정 등 수치/이벤트명이 들어간 핵심 사실")
+    news: List[NewsItem] = Field(default_factory=list, description="중요한 최신 뉴스")
+    macro: List[str] = Field(default_factory=list, description="금리, 환율, FOMC, CPI 등 관련 거시 경제 요인")
+    terms: List[str] = Field(default_factory=list, description="데이터에 등장한 설명할 만한 투자 용어")
+    related: List[str] = Field(default_factory=list, description="관련 종목/섹터")
+    internal_commentary: str = Field(default="", description="내부 콘텐츠(content 도구)의 코멘터리 요약, 없으면 빈 문자열")
+
+
+class MarketContext(MarketSummary):
+    """
+    (키워드, 날짜) 단위로 한 번만 만드는 시장 정보 요약입니다.
+    사용자와 무관한 사실만 담고, 개인화는 이 요약과 고객 프로필만으로 도구 호출 없이 합니다.
+    """
+
+    keyword: str
+    date: str
+    # 도구 호출이 모두 세션 오류로 실패해 데이터 없이 만든 요약이면 True. 짧게만 캐시합니다.
+    degraded: bool = False
+
+
+def context_cache_key(keyword: str, current_date: datetime, bucket_minutes: int = 1440) -> str:
+    return "|".join(["context", keyword.upper(), date_bucket(current_date, bucket_minutes)])
+
+
+def format_market_context(context: Dict[str, Any], max_items: int = 5) -> str:
+    """
+    프롬프트에 넣을 짧은 텍스트로 바꿉니다. JSON 보다 토큰이 적게 들고, 목록은 max_items 개까지만 넣습니다.
+    context 는 캐시에 저장된 dict(MarketContext.model_dump()) 입니다.
+    """
+    lines = [f"요약: {context.get('summary', '')}"]
+    sections = [("key_facts", "핵심 사실"), ("macro", "거시 요인"), ("terms", "주요 용어"), ("related", "관련 종목/섹터")]
+    for key, label in sections:
+        values = [value for value in context.get(key) or [] if value][:max_items]
+        if values:
+            lines.append(f"{label}: " + "; ".join(values))
+    news = (context.get("news") or [])[:max_items]
+    if news:
+        lines.append("뉴스:")
+        for item in news:
+            summary = f" - {item['summary']}" if item.get("summary") else ""
+            date = f"({item['date']}) " if item.get("date") else ""
+            lines.append(f"- {date}{item.get('title', '')}{summary}")
+    if context.get("internal_commentary"):
+        lines.append(f"내부 코멘터리: {context['internal_commentary']}")
+    return "\n".join(lines)
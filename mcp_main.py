@@ -1,20 +1,61 @@
 from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
 import json
+import logging
+import os
+from typing import Optional
+from content_store import ContentStore
+from alias_index import default_index
 
 mcp = FastMCP(name="content")
-    
+
+# 날짜별 애널리스트 코멘터리 파일(*.jsonl, *.parquet)을 두는 디렉터리. 새 파일은 서버 재시작 없이 반영됩니다.
+content_dir = os.getenv("CONTENT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "content"))
+# 한글명/영문명/티커/오타 어느 것으로 저장하거나 조회해도 같은 종목 ID 로 찾습니다.
+alias_index = default_index()
+store = ContentStore(
+    content_dir,
+    reload_interval=float(os.getenv("CONTENT_RELOAD_INTERVAL", "5")),
+    ticker_key=alias_index.keyword_id,
+)
+
+
+class _SkipMissingContent(logging.Filter):
+    """콘텐츠 없음은 정상 흐름이므로 fastmcp 가 도구 오류마다 남기는 traceback 을 생략합니다."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not (record.exc_info and isinstance(record.exc_info[1], ToolError))
+
+
+logging.getLogger("FastMCP.fastmcp.tools.tool_manager").addFilter(_SkipMissingContent())
+
+# 콘텐츠가 없다는 응답은 도구 오류로 돌려줍니다. 정상 결과는 API 서버의 도구 결과 캐시에 남아
+# 나중에 추가된 파일이 캐시 TTL 동안 보이지 않게 되기 때문입니다.
 @mcp.tool()
 def content(date: str, ticker: str) -> str:
-    if date == "2025-09-11":
-        if (ticker) == "테슬라":
-            return """
-            TSLA 주가는 최근 로보택시 서비스 출시와 AI 및 에너지 사업의 강력한 성장 잠재력으로 인해 상승하고 있어요. TSLA 주가는 9월 5일 이후 지속적으로 강세를 보이며 상승하고 있어요. 이러한 상승세는 주로 TSLA의 장기적인 성장 동력에 대한 시장의 긍정적인 평가와 기대감에서 비롯되었어요. 특히 AI와 에너지 저장 사업의 혁신이 두드러져요. 7월 23일 발표된 2분기 실적 보고서에 따르면 TSLA는 6월 오스틴에서 로보택시 서비스를 성공적으로 출시하며 운전자 없는 차량을 통한 새로운 서비스 기반 비즈니스 모델로의 전환을 시작했어요. 이는 미래 수익성에 대한 기대감을 높이는 중요한 진전이에요. 또한, TSLA는 FSD(Full Self-Driving) 기술의 매개변수 수를 10배 늘릴 계획을 발표하고, 옵티머스 휴머노이드 로봇의 양산 목표를 제시하는 등 AI 및 자율주행 분야에 대한 지속적인 투자를 보여주고 있어요. 9월 11일자 소식에 따르면 TSLA의 이러한 AI 중심 전략이 다른 자동차 제조업체들과 차별화된 경쟁 우위를 제공한다는 평가가 나오고 있어요. 같은 날 울프 리서치(Wolfe Research)는 TSLA의 에너지 사업 부문(메가팩, 메가블록)이 급격한 성장과 높은 수익성을 달성하고 있다고 분석하며, 특히 새로운 메가팩 3 시스템의 에너지 밀도 향상과 비용 절감 효과를 긍정적으로 평가했어요. 이러한 에너지 저장 솔루션의 확장은 TSLA의 수익 기반을 다각화하고 장기적인 성장 잠재력을 강화하는 요인으로 작용해요. 이 외에도, 기관 투자자들이 TSLA 주식을 추가 매수하고 있다는 소식과(9월 11일) 벤징가(Benzinga)의 분석에서 TSLA에 대한 긍정적인 자금 흐름이 감지되는 등 시장의 전반적인 신뢰가 주가 상승에 기여하고 있어요. 멕시코의 중국차 관세 부과는 TSLA의 멕시코 기가팩토리의 기회로 작용할 수 있다는 분석도 있어요.
-            """
-        if (ticker) == "오라클":
-            return """
-            ORCL의 주가는 대규모 AI 계약 및 클라우드 사업 성장 기대감으로 급등한 후, 일부 투자자들의 단기 차익 실현과 경쟁사 대비 높은 밸류에이션 부담으로 소폭 하락했어요. ORCL의 주가는 9월 10일 대규모 AI 관련 계약 체결 및 향후 클라우드 사업에 대한 매우 낙관적인 전망 발표로 인해 35.95% 급등하여 사상 최고치를 경신했어요. 하지만 9월 11일, 이러한 급격한 상승세 이후 주가는 소폭 하락하는 움직임을 보였어요. 이는 주로 다음과 같은 몇 가지 복합적인 요인 때문으로 분석돼요. 첫째, 전날의 기록적인 상승폭 이후 자연스러운 시장의 차익 실현 물량이 나왔을 수 있어요. 단기간에 주가가 30% 이상 급등한 만큼, 일부 투자자들이 이익을 확정하려는 움직임을 보이면서 주가에 하방 압력을 가한 것이죠. 둘째, ORCL의 주가는 이미 클라우드 서비스 경쟁사들(아마존, 마이크로소프트 등)에 비해 높은 12개월 선행 주가수익비율(PER) 45.3배를 기록하고 있어, 이러한 고평가 부담이 작용했을 가능성이 있어요. 시장은 긍정적인 전망을 반영했지만, 과도한 밸류에이션에 대한 우려도 공존하며 매도세를 유발했을 수 있어요. 셋째, ORCL이 2026 회계연도에 350억 달러로 자본 지출을 65%나 늘릴 것이라고 발표한 점도 단기적인 비용 증가에 대한 우려로 해석될 수 있어요. 이는 장기적인 성장을 위한 필수적인 투자이지만, 단기적으로는 수익성에 부담을 줄 수 있는 요인으로 인식될 수 있어요. 또한, 회계연도 1분기 매출이 시장 예상치인 150억 달러에 소폭 미치지 못했던 149억 3천만 달러를 기록한 점과, 2026 회계연도 구조조정 계획에 따라 최대 16억 달러의 비용(1분기에 이미 4억 1,500만 달러 기록)이 발생할 수 있다는 점도 일부 투자 심리에 부정적인 영향을 미쳤을 수 있어요. 넷째, 로이터 통신에서 언급된 것처럼 ORCL의 급등이 AI 거품 논쟁에 불을 지피고 있다는 시장 분위기도 하락세에 영향을 주었을 가능성이 있어요. 이러한 거품 우려가 확산되면 투자자들이 위험 회피 모드로 전환하며 매도에 나설 수 있거든요. 마지막으로, 바라지 않게도 ORCL의 대규모 OpenAI 계약이 특정 고객에 대한 의존도를 높여 잠재적인 위험 요인이 될 수 있다는 분석(Barron's) 또한 신중한 투자자들의 매도 결정에 영향을 미쳤을 수 있어요. 이러한 요인들이 복합적으로 작용하여 ORCL의 주가가 대규모 상승 이후 조정을 겪고 있다고 볼 수 있어요.
-            """
-    
+    """date(YYYY-MM-DD) 에 ticker(종목명, 영문명 또는 티커) 에 대해 작성된 애널리스트 코멘터리를 반환합니다."""
+    body = store.get(date, ticker)
+    if body is None:
+        raise ToolError(f"{date} {ticker} 콘텐츠가 없습니다.")
+    return body
+
+@mcp.tool()
+def latest_content(ticker: str, on_or_before: Optional[str] = None) -> str:
+    """ticker 의 가장 최근 코멘터리를 반환합니다. on_or_before(YYYY-MM-DD) 를 주면 그 날짜 이전 중 가장 최근 것을 찾습니다."""
+    found = store.get_latest(ticker, on_or_before)
+    if found is None:
+        raise ToolError(f"{ticker} 콘텐츠가 없습니다.")
+    date, body = found
+    return json.dumps({"date": date, "ticker": ticker, "body": body}, ensure_ascii=False)
+
+@mcp.tool()
+def content_range(ticker: str, start_date: str, end_date: str) -> str:
+    """start_date ~ end_date(YYYY-MM-DD, 양 끝 포함) 사이의 ticker 코멘터리를 날짜순으로 반환합니다."""
+    items = [{"date": date, "body": body} for date, body in store.get_range(ticker, start_date, end_date)]
+    if not items:
+        raise ToolError(f"{start_date} ~ {end_date} {ticker} 콘텐츠가 없습니다.")
+    return json.dumps({"ticker": ticker, "items": items}, ensure_ascii=False)
+
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    mcp.run()
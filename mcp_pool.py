@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
+
+if TYPE_CHECKING:
+    from fastmcp import Client
+
+logger = logging.getLogger(__name__)
+
+
+class PoolClosedError(RuntimeError):
+    pass
+
+
+class MCPSessionPool:
+    """
+    MCP 백엔드별로 미리 연결해 둔 Client 세션을 요청에 빌려주는 풀입니다.
+
+    요청마다 HTTP 핸드셰이크나 stdio 서브프로세스를 새로 만들지 않도록
+    FastAPI lifespan 에서 start() 로 N 개의 세션을 열어두고,
+    백그라운드에서 유휴 세션을 ping 하여 끊어진 세션은 재연결합니다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        client_factory: Callable[[], "Client"],
+        size: int = 2,
+        health_check_interval: float = 30.0,
+        acquire_timeout: Optional[float] = None,
+    ):
+        if size < 1:
+            raise ValueError("size 는 1 이상이어야 합니다.")
+        self.name = name
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._client_factory = client_factory
+        self._idle: "asyncio.Queue[Client]" = asyncio.Queue()
+        self._clients: "List[Client]" = []
+        self._health_task: Optional[asyncio.Task] = None
+        self._warmup_tasks: List[asyncio.Task] = []
+        self._release_tasks: Set[asyncio.Task] = set()
+        self._suspects: Set[int] = set()
+        self._closed = True
+
+        self._acquires = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._wait_time_total = 0.0
+        self._reconnects = 0
+        self._connect_failures = 0
+        self._health_check_failures = 0
+
+    async def start(self, min_ready: Optional[int] = None):
+        """
+        size 개의 세션을 병렬로 연결하고 헬스체크 태스크를 시작합니다.
+        min_ready 를 주면 그 수만큼만 연결을 기다리고, 나머지는 백그라운드에서 연결되는 대로 풀에 넣습니다.
+        """
+        if not self._closed:
+            return
+        self._closed = False
+        self._clients = [self._client_factory() for _ in range(self.size)]
+        ready = self.size if min_ready is None else max(1, min(min_ready, self.size))
+        await asyncio.gather(*(self._connect(client) for client in self._clients[:ready]))
+        for client in self._clients[:ready]:
+            self._idle.put_nowait(client)
+        self._warmup_tasks = [asyncio.create_task(self._warm_up(client)) for client in self._clients[ready:]]
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        """헬스체크를 멈추고 모든 세션을 닫습니다."""
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._warmup_tasks:
+            task.cancel()
+        self._warmup_tasks = []
+        release_tasks = list(self._release_tasks)
+        for task in release_tasks:
+            task.cancel()
+        await asyncio.gather(*release_tasks, return_exceptions=True)
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(
+            *(self._disconnect(client) for client in self._clients),
+            return_exceptions=True,
+        )
+        self._clients = []
+        self._idle = asyncio.Queue()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        유휴 세션 하나를 빌려줍니다. 끊어진 세션이면 빌려주기 전에 재연결하고,
+        사용 중 오류가 나면 반납할 때 연결 상태를 확인합니다.
+        """
+        if self._closed:
+            raise PoolClosedError(f"{self.name} 세션 풀이 시작되지 않았습니다.")
+
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            if self.acquire_timeout is None:
+                client = await self._idle.get()
+            else:
+                client = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+        finally:
+            self._waiting -= 1
+        self._wait_time_total += time.perf_counter() - started
+        self._acquires += 1
+        self._in_use += 1
+
+        if not client.is_connected():
+            slot = self._slot(client)
+            try:
+                client = await self._reconnect(client)
+            except BaseException:
+                # 마감/취소로 재연결이 중단돼도 세션이 풀에서 사라지지 않도록 그 자리의 세션을 돌려놓습니다.
+                # 연결되지 않은 세션이면 다음 acquire() 가 다시 재연결합니다.
+                self._in_use -= 1
+                if not self._closed:
+                    self._idle.put_nowait(self._clients[slot] if slot is not None else client)
+                raise
+            if not client.is_connected():
+                self._in_use -= 1
+                self._idle.put_nowait(client)
+                raise ConnectionError(f"{self.name} 세션에 연결할 수 없습니다.")
+
+        failed = False
+        try:
+            yield client
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._in_use -= 1
+            if id(client) in self._suspects:
+                self._suspects.discard(id(client))
+                failed = True
+            if failed and not self._closed:
+                # 요청 응답을 지연시키지 않도록 연결 확인과 반납은 백그라운드에서 합니다.
+                task = asyncio.create_task(self._check_and_release(client))
+                self._release_tasks.add(task)
+                task.add_done_callback(self._release_tasks.discard)
+            else:
+                self._idle.put_nowait(client)
+
+    def report_failure(self, client: "Client"):
+        """
+        빌려간 세션에서 오류가 났지만 예외가 acquire() 밖으로 나오지 않았을 때(예: genai 가 도구 오류를 삼킨 경우) 부릅니다.
+        반납할 때 연결 상태를 확인하고 필요하면 재연결합니다.
+        """
+        self._suspects.add(id(client))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "connected": sum(1 for client in self._clients if client.is_connected()),
+            "acquires": self._acquires,
+            "avg_wait_ms": round(self._wait_time_total / self._acquires * 1000, 3) if self._acquires else 0.0,
+            "reconnects": self._reconnects,
+            "connect_failures": self._connect_failures,
+            "health_check_failures": self._health_check_failures,
+        }
+
+    async def _connect(self, client: "Client") -> bool:
+        try:
+            await client.__aenter__()
+            return True
+        except Exception as e:
+            self._connect_failures += 1
+            logger.warning("%s 세션 연결 실패: %s", self.name, e)
+            return False
+
+    async def _warm_up(self, client: "Client"):
+        # 연결에 실패해도 풀에 넣습니다. acquire() 가 빌려줄 때 재연결을 시도합니다.
+        await self._connect(client)
+        if not self._closed:
+            self._idle.put_nowait(client)
+
+    async def _disconnect(self, client: "Client"):
+        try:
+            await client.close()
+        except Exception as e:
+            logger.debug("%s 세션 종료 중 오류: %s", self.name, e)
+
+    async def _reconnect(self, client: "Client") -> "Client":
+        """기존 세션을 닫고 팩토리로 새 Client 를 만들어 교체합니다. 연결 실패 시에도 교체는 유지됩니다."""
+        await self._disconnect(client)
+        new_client = self._client_factory()
+        self._replace(client, new_client)
+        if await self._connect(new_client):
+            self._reconnects += 1
+        return new_client
+
+    def _slot(self, client: "Client") -> Optional[int]:
+        for i, existing in enumerate(self._clients):
+            if existing is client:
+                return i
+        return None
+
+    def _replace(self, old: "Client", new: "Client"):
+        slot = self._slot(old)
+        if slot is not None:
+            self._clients[slot] = new
+
+    async def _is_healthy(self, client: "Client") -> bool:
+        if not client.is_connected():
+            return False
+        try:
+            return await asyncio.wait_for(client.ping(), timeout=5.0)
+        except Exception:
+            return False
+
+    async def _check_and_release(self, client: "Client"):
+        slot = self._slot(client)
+        try:
+            if not await self._is_healthy(client):
+                self._health_check_failures += 1
+                client = await self._reconnect(client)
+        finally:
+            # 재연결 도중 취소돼도 그 자리에 있는 세션(새 세션일 수 있음)을 돌려놓습니다.
+            if not self._closed:
+                self._idle.put_nowait(self._clients[slot] if slot is not None else client)
+
+    async def _health_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            # 지금 유휴 상태인 세션만 점검합니다. 대여 중인 세션은 건드리지 않습니다.
+            for _ in range(self._idle.qsize()):
+                try:
+                    client = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                await self._check_and_release(client)
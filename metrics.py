@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 요청 하나 동안 단계별 소요 시간(ms)을 모아 Server-Timing 헤더로 돌려줍니다.
+_current_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("current_trace", default=None)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Summary:
+    """
+    최근 window 개 관측값으로 p50/p95/p99 를 계산하는 Prometheus summary 입니다.
+    _sum/_count 는 누적값입니다.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), window: int = 1024):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.window = window
+        self._samples: Dict[Tuple[str, ...], Deque[float]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        self._counts: Dict[Tuple[str, ...], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(value)
+            self._sums[key] = self._sums.get(key, 0.0) + value
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def quantiles(self, **labels) -> Dict[float, float]:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        return self._quantiles(samples)
+
+    @staticmethod
+    def _quantiles(samples: List[float]) -> Dict[float, float]:
+        if not samples:
+            return {q: float("nan") for q in QUANTILES}
+        return {q: samples[min(int(q * len(samples)), len(samples) - 1)] for q in QUANTILES}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} summary"]
+        with self._lock:
+            snapshot = [(key, sorted(samples), self._sums[key], self._counts[key]) for key, samples in self._samples.items()]
+        for key, samples, total, count in sorted(snapshot):
+            for q, value in self._quantiles(samples).items():
+                quantile = f'quantile="{q}"'
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key, quantile)} {value}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class GaugeCallback:
+    """
+    스크랩할 때 collect() 를 호출해 값을 읽습니다. 풀/캐시 상태처럼 이미 다른 곳에 있는 값을 노출할 때 씁니다.
+    누적값이면 metric_type 을 "counter" 로 줍니다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...],
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+        metric_type: str = "gauge",
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def summary(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Summary:
+        metric = Summary(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help: str, labelnames: Tuple[str, ...], collect, metric_type: str = "gauge") -> GaugeCallback:
+        metric = GaugeCallback(name, help, labelnames, collect, metric_type)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.summary(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간", ("path",)
+)
+REQUESTS = registry.counter(
+    "http_requests_total", "HTTP 요청 수", ("path", "status")
+)
+STAGE_DURATION = registry.summary(
+    "question_stage_duration_seconds", "질문 생성 단계별 소요 시간 (session, model, parse 등)", ("stage",)
+)
+STAGE_ERRORS = registry.counter(
+    "question_stage_errors_total", "질문 생성 단계별 오류 수", ("stage", "exception")
+)
+TOOL_DURATION = registry.summary(
+    "mcp_tool_call_duration_seconds", "MCP 도구 호출 소요 시간", ("backend", "tool", "cached")
+)
+TOOL_ERRORS = registry.counter(
+    "mcp_tool_call_errors_total", "MCP 도구 호출 오류 수", ("backend", "tool", "exception")
+)
+TOKENS = registry.counter(
+    "gemini_tokens_total", "Gemini 토큰 사용량", ("kind",)
+)
+RETRIES = registry.counter(
+    "backend_retries_total", "일시적 오류로 다시 시도한 백엔드 호출 수", ("backend", "exception")
+)
+
+
+def start_trace() -> Dict[str, float]:
+    trace: Dict[str, float] = {}
+    _current_trace.set(trace)
+    return trace
+
+
+def _add_to_trace(name: str, seconds: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace[name] = trace.get(name, 0.0) + seconds * 1000
+
+
+@contextmanager
+def stage(name: str):
+    """단계 소요 시간을 기록하고, 예외가 나면 단계/예외 종류별 오류 수를 올린 뒤 그대로 다시 던집니다."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=name, exception=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=name)
+        _add_to_trace(name, elapsed)
+
+
+def record_tool_call(backend: str, tool: str, seconds: float, cached: bool, error: Optional[BaseException] = None):
+    if error is not None:
+        TOOL_ERRORS.inc(backend=backend, tool=tool, exception=type(error).__name__)
+    TOOL_DURATION.observe(seconds, backend=backend, tool=tool, cached=str(cached).lower())
+    _add_to_trace(f"tool.{backend}.{tool}", seconds)
+
+
+def record_tokens(counts: Optional[Dict[str, int]]):
+    if not counts:
+        return
+    for kind, value in counts.items():
+        if kind != "total_tokens" and value:
+            TOKENS.inc(value, kind=kind)
+
+
+def server_timing_header(trace: Dict[str, float]) -> str:
+    """trace 를 Server-Timing 헤더 값으로 만듭니다. 예: `session;dur=12.3, model;dur=2300.1`"""
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in trace.items())
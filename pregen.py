@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVESTOR_LEVELS = ["초보자", "중급자", "고급자"]
+
+
+def segment_id(level: str, sector: str) -> str:
+    return f"{level}:{sector}"
+
+
+def build_segment_profiles(levels: List[str], sectors: List[str]) -> Dict[str, Dict[str, Any]]:
+    """투자 수준 x 관심섹터 조합마다 README 의 user_data 형식을 따르는 대표 프로필을 만듭니다."""
+    profiles = {}
+    for level in levels:
+        for sector in sectors:
+            profiles[segment_id(level, sector)] = {
+                "user_id": f"segment_{level}_{sector}",
+                "characteristics": [
+                    {"characteristic": "투자경험수준", "value": level},
+                    {"characteristic": "관심섹터", "value": sector},
+                ],
+            }
+    return profiles
+
+
+class PregenScheduler:
+    """
+    키워드 x 대표 프로필 질문을 백그라운드에서 미리 생성해 메모리에 보관합니다.
+
+    interval 초마다, 그리고 날짜가 바뀌면 즉시 전체를 다시 생성합니다.
+    live 트래픽을 방해하지 않도록 분당 생성 수를 제한하고, can_run() 이 False 면 여유가 생길 때까지 기다립니다.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, Any, datetime], Awaitable[List[str]]],
+        keywords: List[str],
+        profiles: Dict[str, Dict[str, Any]],
+        interval: float = 1800.0,
+        max_per_minute: float = 6.0,
+        can_run: Optional[Callable[[], bool]] = None,
+        poll_interval: float = 30.0,
+    ):
+        self.generate = generate
+        self.keywords = [keyword.upper() for keyword in keywords]
+        self.profiles = profiles
+        self.interval = interval
+        self.min_gap = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self.can_run = can_run or (lambda: True)
+        self.poll_interval = poll_interval
+
+        self._store: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_generated_at = 0.0
+        self.running = False
+        self.last_run_started: Optional[datetime] = None
+        self.last_run_finished: Optional[datetime] = None
+        self.last_run_date: Optional[str] = None
+        self.last_run_generated = 0
+        self.last_run_failed = 0
+        self.last_error: Optional[str] = None
+        self.runs = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get(self, keyword: str, segment: str) -> Optional[Dict[str, Any]]:
+        return self._store.get((keyword.upper(), segment))
+
+    def status(self) -> Dict[str, Any]:
+        now = datetime.now()
+        ages = [(now - entry["generated_at"]).total_seconds() for entry in self._store.values()]
+        return {
+            "keywords": self.keywords,
+            "segments": list(self.profiles),
+            "entries": len(self._store),
+            "expected_entries": len(self.keywords) * len(self.profiles),
+            "running": self.running,
+            "runs": self.runs,
+            "last_run_started": self.last_run_started.isoformat() if self.last_run_started else None,
+            "last_run_finished": self.last_run_finished.isoformat() if self.last_run_finished else None,
+            "last_run_date": self.last_run_date,
+            "last_run_generated": self.last_run_generated,
+            "last_run_failed": self.last_run_failed,
+            "last_error": self.last_error,
+            "oldest_entry_age_seconds": round(max(ages), 1) if ages else None,
+            "newest_entry_age_seconds": round(min(ages), 1) if ages else None,
+        }
+
+    def _is_due(self) -> bool:
+        if self.last_run_started is None:
+            return True
+        now = datetime.now()
+        if now.strftime("%Y-%m-%d") != self.last_run_date:
+            return True
+        return (now - self.last_run_started).total_seconds() >= self.interval
+
+    async def _loop(self):
+        while True:
+            if self._is_due():
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.exception("질문 사전 생성 실패")
+            await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self):
+        """모든 키워드 x 프로필 조합을 한 번 생성합니다. 조합 하나가 실패해도 나머지는 계속합니다."""
+        self.running = True
+        self.last_run_started = datetime.now()
+        self.last_run_date = self.last_run_started.strftime("%Y-%m-%d")
+        self.last_run_generated = 0
+        self.last_run_failed = 0
+        try:
+            for keyword in self.keywords:
+                for segment, user_data in self.profiles.items():
+                    await self._wait_for_slot()
+                    current_date = datetime.now()
+                    try:
+                        questions = await self.generate(keyword, user_data, current_date)
+                    except Exception as e:
+                        self.last_run_failed += 1
+                        self.last_error = f"{keyword}/{segment}: {e}"
+                        logger.warning("질문 사전 생성 실패 (%s, %s): %s", keyword, segment, e)
+                        continue
+                    self._store[(keyword, segment)] = {
+                        "keyword": keyword,
+                        "segment": segment,
+                        "questions": questions,
+                        "generated_at": current_date,
+                    }
+                    self.last_run_generated += 1
+        finally:
+            self.running = False
+            self.last_run_finished = datetime.now()
+            self.runs += 1
+
+    async def _wait_for_slot(self):
+        # 분당 생성 수 제한
+        gap = self._last_generated_at + self.min_gap - time.monotonic()
+        if gap > 0:
+            await asyncio.sleep(gap)
+        # live 트래픽이 세션을 쓰고 있으면 여유가 생길 때까지 양보합니다.
+        while not self.can_run():
+            await asyncio.sleep(1.0)
+        self._last_generated_at = time.monotonic()
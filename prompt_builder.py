@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+from datetime import datetime
+from string import Formatter
+from typing import Any, Dict, List, Optional
+
+from market_context import format_market_context
+
+logger = logging.getLogger(__name__)
+
+# 질문 생성 프롬프트 토큰 예산. 넘으면 시장 정보와 프로필의 덜 중요한 부분부터 줄입니다.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+MAX_HOLDINGS = int(os.getenv("PROMPT_MAX_HOLDINGS", "5"))
+
+# 1단계: (키워드, 날짜) 마다 한 번, 도구를 호출해 사용자와 무관한 시장 정보를 정리합니다.
+MARKET_CONTEXT_PROMPT_TEMPLATE = """
+## #1. 역할
+당신은 카카오페이증권의 시장 리서치 담당자입니다.
+특정 고객이 아니라 모든 고객의 질문 생성에 공통으로 쓰일 `{keyword}`의 시장 정보를 정리합니다.
+---
+
+## #2. 지시사항
+
+*   도구를 사용해 `{current_date}` 기준 실시간 데이터를 수집하세요.
+    *   네이버 뉴스 검색으로 `{keyword}` 관련 최신 뉴스를 찾습니다.
+    *   내부 콘텐츠 도구(`latest_content`, `content`)로 `{keyword}` 종목의 코멘터리를 확인합니다. 종목명이나 티커로 조회하고, 없으면 비워 둡니다.
+*   수집한 데이터 전체에서 가장 중요하고 반복적으로 언급되는 주제, 종목명, 경제 이벤트, 수치(예: 실적, 금리)를 추립니다.
+*   금리, 환율, 유가, FOMC, CPI 등 `{keyword}`에 영향을 주는 거시 요인과, 데이터에 등장한 설명할 만한 투자 용어도 정리합니다.
+*   데이터에 있는 사실만 적고 추측이나 투자 권유는 넣지 않습니다. 고객별 표현은 다음 단계에서 하므로 사실 위주로 간결하게 씁니다.
+
+---
+
+## #3. 입력 데이터
+
+### Keyword
+```
+{keyword}
+```
+
+### Current Date
+```
+{current_date}
+```
+
+## 출력
+{format_instructions}
+"""
+
+# 2단계: 1단계 시장 정보와 고객 프로필만으로 도구 호출 없이 개인화된 질문을 만듭니다.
+QUESTION_PROMPT_TEMPLATE = """
+## #1. 페르소나
+당신은 카카오페이증권에서 운영하는 AI 어시스턴트입니다. 
+고객의 투자 수준과 관심사에 맞춰, 아래 시장 정보를 근거로 개인화된 핵심 질문을 생성하여 투자 결정에 도움을 줍니다.
+---
+
+## #2. 지시사항
+
+`{keyword}`에 대한 Market Context와 User Info(`#3. 입력 데이터`)만 사용하여, **해당 고객이 앱에서 즉시 클릭하고 싶을 만한 개인화된 질문 5개를 생성**하세요.
+Market Context에 없는 숫자나 이벤트명은 만들어내지 마세요.
+
+*   **카테고리 균형:** 시황/경제(금리, 환율, 유가, FOMC, CPI 등), 종목/산업(주가 변동, 실적 발표, 신기술, 산업 동향), 개념/용어(데이터에 등장한 투자 용어나 경제 현상 설명)를 고루 포함합니다.
+*   **수준별 난이도:**
+    *   **초보자**: 기본적인 개념 설명과 단순한 시장 동향 질문
+    *   **중급자**: 구체적인 분석과 전략적 관점의 질문
+    *   **고급자**: 심화된 분석과 전문적인 투자 전략 질문
+*   **개인화:** 고객의 보유 종목이나 관심 업종이 `{keyword}`와 연관되면 질문에 언급합니다.
+*   **시의성:** Market Context의 구체적인 사실(숫자, 이벤트명)을 포함합니다.
+*   **어투:** 친근한 어투를 사용합니다. (예: **"~궁금하지 않아?"**, **"~핵심만 알려줘"**, **"~어떻게 될까?"**, **"~이유가 뭐야?"**)
+*   예시
+    *   (초보자-시황) "오늘 FOMC 발표가 뭔지, 주식에 어떤 영향이 있을까?"
+    *   (중급자-종목) "엔비디아 주가 급등, AI 칩 수요 증가가 실적에 미치는 영향은?"
+    *   (고급자-개념) "어닝 서프라이즈의 통계적 유의성과 포트폴리오 리밸런싱 전략은?"
+
+—
+
+## #3. 입력 데이터
+
+### Keyword
+```
+{keyword}
+```
+
+### Market Context
+```
+{market_context}
+```
+
+### User Info
+```
+{profile}
+```
+
+### Current Date
+```
+{current_date}
+```
+
+## 출력
+{format_instructions}
+"""
+
+
+def _compile(template: str) -> List[tuple]:
+    """템플릿을 (고정 문자열, 필드 이름) 조각으로 미리 나눠 두어 요청마다 format 파싱을 하지 않습니다."""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+_COMPILED_MARKET_CONTEXT_PROMPT = _compile(MARKET_CONTEXT_PROMPT_TEMPLATE)
+_COMPILED_QUESTION_PROMPT = _compile(QUESTION_PROMPT_TEMPLATE)
+
+
+def _render(compiled: List[tuple], values: Dict[str, str]) -> str:
+    return "".join(literal + (values[field] if field is not None else "") for literal, field in compiled)
+
+
+def _characteristics(user_data: Any) -> Dict[str, Any]:
+    if isinstance(user_data, str):
+        try:
+            user_data = json.loads(user_data)
+        except ValueError:
+            return {}
+    if not isinstance(user_data, dict):
+        return {}
+    characteristics = user_data.get("characteristics")
+    if not isinstance(characteristics, list):
+        return {}
+    return {
+        item.get("characteristic"): item.get("value")
+        for item in characteristics
+        if isinstance(item, dict)
+    }
+
+
+def compact_profile(user_data: Any) -> Dict[str, Any]:
+    """
+    user_data 에서 프롬프트가 쓰는 필드(투자 수준, 보유 종목, 관심섹터, 거래 패턴)만 뽑아냅니다.
+    confidence, generated_at, description 같은 메타데이터는 버립니다.
+    """
+    characteristics = _characteristics(user_data)
+    portfolio = characteristics.get("자산포트폴리오정보") or {}
+    trading = characteristics.get("거래행태정보") or {}
+    holdings = [
+        item.get("종목명")
+        for item in (portfolio.get("보유종목") or [] if isinstance(portfolio, dict) else [])
+        if isinstance(item, dict) and item.get("종목명")
+    ]
+    profile = {
+        "level": characteristics.get("투자경험수준"),
+        "holdings": holdings,
+        "sector": characteristics.get("관심섹터"),
+        "pattern": trading.get("거래패턴") if isinstance(trading, dict) else None,
+    }
+    return {key: value for key, value in profile.items() if value}
+
+
+def format_profile(profile: Dict[str, Any], max_holdings: int = MAX_HOLDINGS) -> str:
+    if not profile:
+        return "정보 없음"
+    labels = [("level", "수준"), ("holdings", "보유"), ("sector", "관심섹터"), ("pattern", "거래패턴")]
+    parts = []
+    for key, label in labels:
+        value = profile.get(key)
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(value[:max_holdings])
+        parts.append(f"{label}: {value}")
+    return "; ".join(parts)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정치입니다. count_tokens API 호출 없이 예산 판단에만 씁니다.
+    영문/숫자는 약 4자당 1토큰, 한글 등 비 ASCII 문자는 약 1자당 1토큰으로 계산합니다.
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _shorten_context(context: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """시장 정보의 자유 텍스트(요약, 코멘터리, 목록 항목, 뉴스 제목/요약)를 limit 자로 자른 사본을 만듭니다."""
+    shortened = dict(context)
+    for key in ("summary", "internal_commentary"):
+        if shortened.get(key):
+            shortened[key] = _truncate(str(shortened[key]), limit)
+    for key in ("key_facts", "macro", "terms", "related"):
+        shortened[key] = [_truncate(str(value), limit) for value in shortened.get(key) or [] if value]
+    shortened["news"] = [
+        {**item, "title": _truncate(str(item.get("title") or ""), limit), "summary": _truncate(str(item.get("summary") or ""), limit)}
+        for item in shortened.get("news") or []
+        if isinstance(item, dict)
+    ]
+    return shortened
+
+
+def build_market_context_prompt(keyword: str, current_date: datetime, format_instructions: str) -> str:
+    return _render(_COMPILED_MARKET_CONTEXT_PROMPT, {
+        "keyword": keyword,
+        "current_date": str(current_date),
+        "format_instructions": format_instructions,
+    })
+
+
+def build_question_prompt(
+    keyword: str,
+    user_data: Any,
+    current_date: datetime,
+    format_instructions: str,
+    market_context: Dict[str, Any],
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    개인화 질문 프롬프트를 만듭니다. 고객 정보는 압축 프로필로 한 번만 넣고, 시장 정보는 짧은 텍스트로 넣습니다.
+    토큰 예산을 넘으면 시장 정보 항목 수 -> 보유 종목 수 -> 거래 패턴 -> 관심섹터 순으로 줄이고,
+    그래도 넘으면 마지막으로 시장 정보의 텍스트(요약, 코멘터리, 뉴스 등)를 점점 짧게 자릅니다.
+    """
+    token_budget = token_budget or PROMPT_TOKEN_BUDGET
+    profile = compact_profile(user_data)
+    values = {
+        "keyword": keyword,
+        "current_date": str(current_date),
+        "format_instructions": format_instructions,
+        "market_context": format_market_context(market_context),
+        "profile": format_profile(profile),
+    }
+    prompt = _render(_COMPILED_QUESTION_PROMPT, values)
+
+    reductions = [
+        lambda v, p: ({**v, "market_context": format_market_context(market_context, max_items=2)}, p),
+        lambda v, p: (v, {**p, "holdings": p.get("holdings", [])[:1]}),
+        lambda v, p: (v, {k: val for k, val in p.items() if k != "pattern"}),
+        lambda v, p: (v, {k: val for k, val in p.items() if k != "sector"}),
+    ]
+    for limit in (300, 150, 80, 40):
+        reductions.append(lambda v, p, limit=limit: (
+            {**v, "market_context": format_market_context(_shorten_context(market_context, limit), max_items=2)}, p
+        ))
+    for reduce in reductions:
+        if estimate_tokens(prompt) <= token_budget:
+            break
+        values, profile = reduce(values, profile)
+        values["profile"] = format_profile(profile)
+        prompt = _render(_COMPILED_QUESTION_PROMPT, values)
+
+    if estimate_tokens(prompt) > token_budget:
+        logger.warning("프롬프트가 토큰 예산을 넘습니다: 추정 %d > %d", estimate_tokens(prompt), token_budget)
+    return prompt
+
+
+def log_token_usage(response: Any, label: str, keyword: str) -> Optional[Dict[str, int]]:
+    """Gemini 응답의 usage_metadata 에서 입력/출력 토큰 수를 로그로 남기고 반환합니다."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    counts = {
+        "prompt_tokens": usage.prompt_token_count or 0,
+        "tool_use_prompt_tokens": usage.tool_use_prompt_token_count or 0,
+        "output_tokens": usage.candidates_token_count or 0,
+        "thoughts_tokens": usage.thoughts_token_count or 0,
+        "total_tokens": usage.total_token_count or 0,
+    }
+    logger.info(
+        "%s 토큰 사용량 keyword=%s prompt=%d tool_use_prompt=%d output=%d thoughts=%d total=%d",
+        label, keyword, counts["prompt_tokens"], counts["tool_use_prompt_tokens"],
+        counts["output_tokens"], counts["thoughts_tokens"], counts["total_tokens"],
+    )
+    return counts
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def user_data_digest(user_data: Any) -> str:
+    """user_data 를 키 순서와 무관한 안정적인 해시로 바꿉니다. JSON 문자열로 들어와도 같은 값이 나옵니다."""
+    if isinstance(user_data, str):
+        try:
+            user_data = json.loads(user_data)
+        except ValueError:
+            pass
+    canonical = json.dumps(user_data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def date_bucket(current_date: datetime, bucket_minutes: int = 1440) -> str:
+    """current_date 를 bucket_minutes 단위 구간으로 자릅니다. 기본값은 하루 단위입니다."""
+    day = current_date.strftime("%Y-%m-%d")
+    if bucket_minutes >= 1440:
+        return day
+    minute_of_day = current_date.hour * 60 + current_date.minute
+    return f"{day}#{minute_of_day // bucket_minutes}"
+
+
+def make_cache_key(keyword: str, user_data: Any, current_date: datetime, bucket_minutes: int = 1440) -> str:
+    return "|".join([keyword.upper(), user_data_digest(user_data), date_bucket(current_date, bucket_minutes)])
+
+
+class MemoryCacheBackend:
+    """프로세스 메모리에 max_entries 개까지 보관하고 넘치면 가장 오래 안 쓴 항목부터 버립니다."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def clear(self):
+        self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    SQLite 파일에 캐시를 저장합니다. 재시작 후에도 유지되고 여러 uvicorn 워커가 같은 파일을 공유할 수 있습니다.
+    값은 JSON 으로 직렬화 가능한 것만 저장합니다.
+
+    size() 는 지표 수집처럼 이벤트 루프에서 불리므로 쿼리하지 않고, 스레드에서 도는 쓰기 작업이
+    마지막으로 센 항목 수를 돌려줍니다(다른 워커의 쓰기는 이 워커가 다음에 쓸 때 반영됩니다).
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS response_cache_accessed_at ON response_cache (accessed_at)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._size = max(self._size - 1, 0)
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            count = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+            overflow = count - self.max_entries
+            self._size = min(count, self.max_entries)
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key IN "
+                    "(SELECT key FROM response_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def _clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+            self._size = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+    def size(self) -> int:
+        return self._size
+
+
+class ResponseCache:
+    """
+    TTL 캐시 + single-flight 입니다. 같은 키로 동시에 들어온 요청은 하나의 compute 결과를 함께 기다립니다.
+    compute 가 실패하면 결과를 캐시하지 않고 기다리던 요청 모두에게 같은 예외를 전달합니다.
+    """
+
+    def __init__(self, backend=None, ttl: float = 600.0):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None,
+    ) -> Any:
+        """ttl_for 를 주면 계산한 값마다 TTL 을 정합니다. None 을 돌려주면 기본 TTL, 0 이하면 캐시하지 않습니다."""
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._compute_and_store(key, compute, ttl_for))
+            # 기다리던 요청이 모두 마감/취소로 떠나도 예외가 "never retrieved" 로 남지 않게 소비합니다.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        # 먼저 온 요청이 취소되어도 기다리는 다른 요청에 영향이 없도록 shield 합니다.
+        return await asyncio.shield(task)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """compute 없이 캐시만 조회합니다. 스트리밍처럼 결과를 직접 만들어 set() 하는 경로에서 씁니다."""
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl > 0:
+            await self.backend.set(key, value, ttl)
+
+    async def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None,
+    ) -> Any:
+        try:
+            value = await compute()
+            await self.set(key, value, ttl_for(value) if ttl_for is not None else None)
+            return value
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "evictions": self.backend.evictions,
+            "inflight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
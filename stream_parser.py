@@ -0,0 +1,73 @@
+import json
+from typing import List
+
+
+class QuestionStreamParser:
+    """
+    스트리밍으로 들어오는 JSON 텍스트에서 "questions" 배열의 문자열 원소를 완성되는 대로 꺼냅니다.
+
+    ```json 코드 블록이나 다른 키가 섞여 있어도 "questions" 키 뒤의 배열만 봅니다.
+    """
+
+    def __init__(self, key: str = "questions"):
+        self._key = f'"{key}"'
+        self._buffer = ""
+        self._pos = 0  # 아직 처리하지 않은 위치
+        self._in_array = False
+        self._done = False
+        self.questions: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[str]:
+        """chunk 를 이어 붙이고, 이번에 새로 완성된 질문들을 반환합니다."""
+        self._buffer += chunk
+        found = []
+        while not self._done:
+            if not self._in_array:
+                key_at = self._buffer.find(self._key, self._pos)
+                if key_at < 0:
+                    break
+                bracket_at = self._buffer.find("[", key_at + len(self._key))
+                if bracket_at < 0:
+                    break
+                self._in_array = True
+                self._pos = bracket_at + 1
+                continue
+
+            # 배열 안: 공백/쉼표를 건너뛰고 다음 문자열 또는 배열 끝을 찾습니다.
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                break
+            if self._buffer[self._pos] == "]":
+                self._done = True
+                self._pos += 1
+                break
+            if self._buffer[self._pos] != '"':
+                # 문자열이 아닌 원소는 무시하고 종료합니다. 이후는 전체 파싱에 맡깁니다.
+                self._done = True
+                break
+            end = self._find_string_end(self._pos)
+            if end < 0:
+                break
+            question = json.loads(self._buffer[self._pos:end + 1])
+            self._pos = end + 1
+            self.questions.append(question)
+            found.append(question)
+        return found
+
+    def _find_string_end(self, start: int) -> int:
+        """start 위치의 따옴표로 시작하는 JSON 문자열이 닫히는 위치를 찾습니다. 아직 닫히지 않았으면 -1."""
+        i = start + 1
+        while i < len(self._buffer):
+            char = self._buffer[i]
+            if char == "\\":
+                i += 2
+                continue
+            if char == '"':
+                return i
+            i += 1
+        return -1
@@ -0,0 +1,99 @@
+import json
+import re
+from typing import Any, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar("T", bound=BaseModel)
+
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class StructuredOutputError(ValueError):
+    """모델 출력을 JSON/스키마로 해석하지 못했을 때 씁니다. 원문 앞부분을 담아 원인 파악을 돕습니다."""
+
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+    def snippet(self, limit: int = 200) -> str:
+        text = " ".join(self.text.split())
+        return text if len(text) <= limit else text[:limit] + "..."
+
+
+def format_instructions(model: Type[BaseModel]) -> str:
+    """
+    도구 호출과 함께라 response_schema 를 쓸 수 없는 호출에서 프롬프트에 넣을 출력 형식 안내문입니다.
+    스키마의 title 과 모델 docstring(description)은 토큰만 차지하므로 빼고, 필드 설명만 남깁니다.
+    """
+
+    def strip(value: Any) -> Any:
+        if isinstance(value, dict):
+            is_model = "properties" in value
+            return {
+                k: strip(v) for k, v in value.items()
+                if not (k == "title" and isinstance(v, str)) and not (is_model and k == "description")
+            }
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+
+    schema = json.dumps(strip(model.model_json_schema()), ensure_ascii=False, separators=(",", ":"))
+    return f"아래 JSON 스키마를 따르는 JSON 객체 하나만 출력하세요. 설명이나 다른 문장은 덧붙이지 마세요.\n```json\n{schema}\n```"
+
+
+def _balanced_object(text: str) -> Optional[str]:
+    """문자열 안의 괄호는 건너뛰며 첫 번째 { 부터 짝이 맞는 } 까지를 잘라냅니다."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return None
+
+
+def extract_json(text: str) -> Any:
+    """
+    모델 출력에서 JSON 을 꺼냅니다. 그대로 파싱 -> 코드 블록 안쪽 -> 본문 중 첫 JSON 객체 순으로 시도하고,
+    각 후보는 끝에 붙은 쉼표를 지운 버전도 시도합니다.
+    """
+    text = (text or "").strip()
+    candidates = [text]
+    candidates.extend(match.strip() for match in _CODE_FENCE.findall(text))
+    embedded = _balanced_object(text)
+    if embedded is not None:
+        candidates.append(embedded)
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                continue
+    raise StructuredOutputError("모델 응답에서 JSON 을 찾을 수 없습니다.", text)
+
+
+def parse_structured(text: str, model: Type[T]) -> T:
+    data = extract_json(text)
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise StructuredOutputError(f"모델 응답이 {model.__name__} 형식과 맞지 않습니다: {e.error_count()}개 필드 오류", text) from e
@@ -0,0 +1,43 @@
+import unittest
+
+from alias_index import default_index
+
+
+class AliasIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = default_index()
+
+    def test_aliases_resolve_to_entity_id(self):
+        for text in ["테슬라", "Tesla", " tsla ", "테슬러", "ＴＳＬＡ"]:
+            with self.subTest(text=text):
+                self.assertEqual(self.index.keyword_id(text), "TSLA")
+        self.assertEqual(self.index.keyword_id("카카오 페이"), "377300")
+
+    def test_prefixes_and_free_form_queries_are_not_canonicalized(self):
+        # 다른 종목(우선주, 자회사)이나 자유 질의가 기존 종목 ID 로 합쳐지면 캐시와 콘텐츠 조회가 섞입니다.
+        cases = {
+            "카카오뱅크": "카카오뱅크",
+            "삼성전자우": "삼성전자우",
+            "카카오페이증권": "카카오페이증권",
+            "애플망고": "애플망고",
+            "애플 vs 삼성전자": "애플 VS 삼성전자",
+            "테슬라 실적 발표 언제야": "테슬라 실적 발표 언제야",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(self.index.keyword_id(text), expected)
+
+    def test_suggest_matches_in_progress_syllables(self):
+        for prefix in ["테", "텟", "테ㅅ", "ts"]:
+            with self.subTest(prefix=prefix):
+                self.assertIn("TSLA", [entity.id for entity in self.index.suggest(prefix)])
+
+    def test_suggest_clamps_limit(self):
+        self.assertEqual(len(self.index.suggest("삼", limit=-3)), 1)
+        self.assertEqual(len(self.index.suggest("삼", limit=0)), 1)
+        self.assertLessEqual(len(self.index.suggest("ㅅ", limit=1000)), self.index.max_suggestions)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+
+from content_store import ContentStore
+
+
+def write_jsonl(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write((line if isinstance(line, str) else json.dumps(line, ensure_ascii=False)) + "\n")
+    # 같은 크기로 빠르게 다시 쓰면 mtime 이 같을 수 있어 변경이 보이도록 올려 둡니다.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class ContentStoreReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "2025-09.jsonl")
+        write_jsonl(self.path, [
+            {"date": "2025-09-11", "ticker": "TSLA", "body": "테슬라 11일"},
+            {"date": "2025-09-12", "ticker": "TSLA", "body": "테슬라 12일"},
+        ])
+        self.store = ContentStore(self.tmp.name, reload_interval=3600)
+
+    def tearDown(self):
+        self.store.reload_interval = 3600
+        for path in list(self.store._files):
+            self.store._unload(path)
+        self.tmp.cleanup()
+
+    def test_skips_invalid_lines_and_keeps_rest_of_file(self):
+        write_jsonl(self.path, [
+            "null",
+            "[1]",
+            {"date": "2025-09-11", "ticker": 373220, "body": "숫자 티커"},
+            {"date": "2025-09-11", "body": "티커 없음"},
+            {"date": "2025-09-12", "ticker": "ORCL", "body": "오라클 12일"},
+        ])
+        self.store.reload()
+        self.assertEqual(self.store.get("2025-09-11", "373220"), "숫자 티커")
+        self.assertEqual(self.store.get("2025-09-12", "ORCL"), "오라클 12일")
+        self.assertEqual(self.store.stats()["entries"], 2)
+
+    def test_rewrite_drops_stale_entries(self):
+        write_jsonl(self.path, [
+            {"date": "2025-09-12", "ticker": "ORCL", "body": "오라클 12일"},
+            {"date": "2025-09-13", "ticker": 5930, "body": "삼성전자"},
+        ])
+        self.store.reload()
+        self.assertIsNone(self.store.get("2025-09-12", "TSLA"))
+        self.assertIsNone(self.store.get_latest("TSLA"))
+        self.assertEqual(self.store.get("2025-09-12", "ORCL"), "오라클 12일")
+
+    def test_failed_load_does_not_leave_untracked_entries(self):
+        def ticker_key(ticker):
+            if ticker == "BOOM":
+                raise RuntimeError("boom")
+            return ticker.strip()
+
+        store = ContentStore(self.tmp.name, reload_interval=3600, ticker_key=ticker_key)
+        write_jsonl(self.path, [
+            {"date": "2025-09-12", "ticker": "ORCL", "body": "오라클 12일"},
+            {"date": "2025-09-13", "ticker": "BOOM", "body": "실패"},
+        ])
+        store.reload()
+        self.assertEqual(store.get("2025-09-12", "ORCL"), "오라클 12일")
+        os.remove(self.path)
+        store.reload()
+        self.assertEqual(store.stats()["entries"], 0)
+        self.assertIsNone(store.get("2025-09-12", "ORCL"))
+
+    def test_in_place_truncation_before_reload_returns_none(self):
+        self.assertEqual(self.store.get("2025-09-12", "TSLA"), "테슬라 12일")
+        with open(self.path, "r+b") as f:
+            f.truncate(10)
+        self.assertIsNone(self.store.get("2025-09-12", "TSLA"))
+        self.store.reload()
+        self.assertIsNone(self.store.get("2025-09-11", "TSLA"))
+
+    def test_in_place_rewrite_before_reload_does_not_serve_other_ticker(self):
+        with open(self.path, "r+b") as f:
+            f.write(json.dumps({"date": "2025-09-11", "ticker": "ORCL", "body": "오라클"}, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.assertIsNone(self.store.get("2025-09-11", "TSLA"))
+
+
+if __name__ == "__main__":
+    unittest.main()
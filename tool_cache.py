@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+    from mcp import types as mcp_types
+
+
+def normalize_arguments(arguments: Optional[Dict[str, Any]]) -> str:
+    """키 순서와 문자열 앞뒤/중복 공백 차이를 없앤 인자 문자열을 만듭니다."""
+
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    return json.dumps(normalize(arguments or {}), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+class ToolResultCache:
+    """
+    MCP 도구 호출 결과를 (네임스페이스, 도구 이름, 정규화된 인자) 로 캐시합니다.
+    도구별 TTL 을 따로 줄 수 있고, 결과 크기 합이 max_bytes 를 넘으면 가장 오래 안 쓴 항목부터 버립니다.
+    observer 를 주면 도구 호출마다 observer(namespace, tool, seconds, cached, error) 로 알려줍니다.
+    call_timeout 을 주면 캐시에 없는 호출은 call_timeout() 이 돌려준 초만큼만 기다립니다(None 이면 제한 없음).
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 300.0,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        max_bytes: int = 50 * 1024 * 1024,
+        list_tools_ttl: float = 3600.0,
+        observer: Optional[Callable[..., None]] = None,
+        call_timeout: Optional[Callable[[], Optional[float]]] = None,
+    ):
+        self.default_ttl = default_ttl
+        self.observer = observer
+        self.call_timeout = call_timeout
+        self.tool_ttls = tool_ttls or {}
+        self.max_bytes = max_bytes
+        self.list_tools_ttl = list_tools_ttl
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, int, mcp_types.CallToolResult]]" = OrderedDict()
+        self._list_tools: "Dict[str, Tuple[float, mcp_types.ListToolsResult]]" = {}
+        self._bytes = 0
+        self._tool_stats: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.tool_ttls.get(tool_name, self.default_ttl)
+
+    def wrap(self, session: "ClientSession", namespace: str) -> "ClientSession":
+        return caching_session_class()(session, self, namespace)
+
+    def get(self, namespace: str, tool_name: str, arguments: Optional[Dict[str, Any]]) -> "Optional[mcp_types.CallToolResult]":
+        key = (namespace, tool_name, normalize_arguments(arguments))
+        stats = self._tool_stats.setdefault(f"{namespace}.{tool_name}", {"hits": 0, "misses": 0})
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.time():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            stats["misses"] += 1
+            return None
+        stats["hits"] += 1
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def set(self, namespace: str, tool_name: str, arguments: Optional[Dict[str, Any]], result: "mcp_types.CallToolResult"):
+        ttl = self.ttl_for(tool_name)
+        # 오류 응답은 캐시하지 않습니다. TTL 0 인 도구는 캐시에서 제외합니다.
+        if result.isError or ttl <= 0:
+            return
+        key = (namespace, tool_name, normalize_arguments(arguments))
+        size = len(result.model_dump_json())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.time() + ttl, size, result)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def get_list_tools(self, namespace: str) -> "Optional[mcp_types.ListToolsResult]":
+        entry = self._list_tools.get(namespace)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def set_list_tools(self, namespace: str, result: "mcp_types.ListToolsResult"):
+        self._list_tools[namespace] = (time.time() + self.list_tools_ttl, result)
+
+    def clear(self):
+        self._entries.clear()
+        self._list_tools.clear()
+        self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, counts in self._tool_stats.items():
+            total = counts["hits"] + counts["misses"]
+            tools[name] = {**counts, "hit_rate": round(counts["hits"] / total, 4) if total else 0.0}
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "tools": tools,
+        }
+
+
+_caching_session_class = None
+
+
+def caching_session_class() -> type:
+    """
+    genai 는 tools 에 들어온 객체가 mcp.ClientSession 인지로 MCP 세션을 판별하므로 ClientSession 을 상속해야 합니다.
+    mcp import 가 무거워 워커 기동을 늦추지 않도록, 처음 wrap 할 때 CachingSessionMixin 과 합쳐 클래스를 만듭니다.
+    """
+    global _caching_session_class
+    if _caching_session_class is None:
+        from mcp import ClientSession
+        _caching_session_class = type("CachingClientSession", (CachingSessionMixin, ClientSession), {})
+    return _caching_session_class
+
+
+class CachingSessionMixin:
+    """
+    ClientSession 의 초기화는 하지 않고 list_tools/call_tool 만 가로채 원래 세션에 위임합니다.
+
+    genai 는 도구 호출 예외를 모델에게 오류 응답으로 넘기고 삼키므로, 세션 수준 오류(연결 끊김, 타임아웃 등)는
+    calls/errors 로 세어 두고 호출하는 쪽이 세션 점검과 결과 신뢰도 판단에 씁니다.
+    도구가 정상적으로 돌려준 오류 결과(isError)는 세션 오류로 세지 않습니다.
+    """
+
+    def __init__(self, session: "ClientSession", cache: ToolResultCache, namespace: str):
+        self._session = session
+        self._cache = cache
+        self._namespace = namespace
+        self.calls = 0
+        self.errors = 0
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    async def list_tools(self, *args, **kwargs) -> "mcp_types.ListToolsResult":
+        if args or kwargs:
+            return await self._session.list_tools(*args, **kwargs)
+        result = self._cache.get_list_tools(self._namespace)
+        if result is None:
+            result = await self._session.list_tools()
+            self._cache.set_list_tools(self._namespace, result)
+        return result
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, *args, **kwargs) -> "mcp_types.CallToolResult":
+        started = time.perf_counter()
+        self.calls += 1
+        result = self._cache.get(self._namespace, name, arguments)
+        if result is not None:
+            self._observe(name, started, cached=True)
+            return result
+        timeout = self._cache.call_timeout() if self._cache.call_timeout is not None else None
+        try:
+            if timeout is None:
+                result = await self._session.call_tool(name, arguments, *args, **kwargs)
+            else:
+                result = await asyncio.wait_for(self._session.call_tool(name, arguments, *args, **kwargs), max(timeout, 0.0))
+        except Exception as e:
+            self.errors += 1
+            self._observe(name, started, cached=False, error=e)
+            raise
+        self._observe(name, started, cached=False)
+        self._cache.set(self._namespace, name, arguments, result)
+        return result
+
+    def _observe(self, name: str, started: float, cached: bool, error: Optional[BaseException] = None):
+        if self._cache.observer is not None:
+            self._cache.observer(self._namespace, name, time.perf_counter() - started, cached, error)